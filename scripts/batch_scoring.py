@@ -0,0 +1,96 @@
+"""Column-wise candidate and ValueScore scoring, vectorized with NumPy when it is installed."""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from common import DomainWeights
+
+BATCH_SCORING_NUMPY = os.environ.get("BATCH_SCORING_NUMPY", "1").lower() not in ("0", "false", "no")
+# Küçük partilerde dizi kurma maliyeti kazançtan fazla
+NUMPY_MIN_BATCH = int(os.environ.get("NUMPY_MIN_BATCH", "64"))
+
+# NumPy ilk büyük partide yüklenir (~100 ms); soğuk başlangıçta ve küçük döngülerde hiç yüklenmez
+np: Any = None
+_numpy_checked = False
+
+
+def _use_numpy(size: int) -> bool:
+    global np, _numpy_checked
+    if not BATCH_SCORING_NUMPY or size < NUMPY_MIN_BATCH:
+        return False
+    if not _numpy_checked:
+        _numpy_checked = True
+        try:  # NumPy isteğe bağlı; yoksa saf Python yolu kullanılır
+            import numpy
+        except ImportError:  # pragma: no cover - depends on the environment
+            logging.debug("NumPy is not installed; scoring batches in pure Python")
+        else:
+            np = numpy
+    return np is not None
+
+
+def candidate_scores(
+    published_epochs: Sequence[float],
+    hosts: Sequence[str],
+    corroborations: Sequence[int],
+    weights: Dict[str, float],
+    now_ts: float,
+    lookback_hours: int,
+) -> Tuple[List[float], List[float], List[float]]:
+    """Recency, domain weight and accuracy for columns of candidates.
+
+    Same formulas as ``compute_recency_score``/``domain_weight_for``/``compute_accuracy``.
+    Accuracy is rounded with ``round`` on both paths so stored values do not depend on
+    whether NumPy is installed.
+    """
+    domains = weights if isinstance(weights, DomainWeights) else DomainWeights(weights)
+    domain_weight = [domains.for_host(host) for host in hosts]
+    if _use_numpy(len(hosts)):
+        published = np.asarray(published_epochs, dtype=float)
+        if lookback_hours <= 0:
+            recency_arr = np.zeros(len(published))
+        else:
+            hours = np.maximum((now_ts - published) / 3600, 0)
+            recency_arr = np.maximum(0.0, 1.0 - np.minimum(hours / lookback_hours, 1.0))
+        accuracy_arr = np.asarray(domain_weight) + np.asarray(corroborations, dtype=float) + recency_arr
+        recency = recency_arr.tolist()
+        accuracy = [round(value, 3) for value in accuracy_arr.tolist()]
+        return recency, domain_weight, accuracy
+    if lookback_hours <= 0:
+        recency = [0.0] * len(hosts)
+    else:
+        recency = [max(0.0, 1.0 - min(max((now_ts - published) / 3600, 0) / lookback_hours, 1.0)) for published in published_epochs]
+    accuracy = [round(weight + corr + rec, 3) for weight, corr, rec in zip(domain_weight, corroborations, recency)]
+    return recency, domain_weight, accuracy
+
+
+def value_scores(
+    accuracy: Sequence[float],
+    replies: Sequence[int],
+    pinned: Sequence[bool],
+    published_epochs: Sequence[Optional[float]],
+    now_ts: float,
+    weights: Tuple[float, float, float, float],
+) -> List[float]:
+    """ValueScore for columns of items; ``weights`` is ``(W_ACC, W_ENG, W_PIN, W_AGE)``.
+
+    Matches ``promote_and_expire.value_score``: an unknown publication time counts as new.
+    """
+    w_acc, w_eng, w_pin, w_age = weights
+    published = [now_ts if value is None else value for value in published_epochs]
+    if _use_numpy(len(published)):
+        eng = np.minimum(np.asarray(replies, dtype=float) / 5, 1.0)
+        pin = np.asarray(pinned, dtype=float)
+        age_h = np.maximum((now_ts - np.asarray(published, dtype=float)) / 3600, 0)
+        age_factor = np.maximum(0.0, 1.0 - np.minimum(age_h / 24, 1.0))
+        score_arr = w_acc * np.asarray(accuracy, dtype=float) + w_eng * eng + w_pin * pin + w_age * age_factor
+        return [round(score, 3) for score in score_arr.tolist()]
+    scores: List[float] = []
+    for acc, reply_count, is_pinned, published_ts in zip(accuracy, replies, pinned, published):
+        eng = min(reply_count / 5, 1.0)
+        pin = 1.0 if is_pinned else 0.0
+        age_factor = max(0.0, 1.0 - min(max((now_ts - published_ts) / 3600, 0) / 24, 1.0))
+        scores.append(round(w_acc * float(acc) + w_eng * eng + w_pin * pin + w_age * age_factor, 3))
+    return scores
@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+"""Offline benchmarks for the pipeline's hot paths on synthetic feeds and state."""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import datetime as dt
+import gc
+import json
+import logging
+import os
+import pathlib
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from batch_scoring import value_scores
+from common import (
+    NewsItem,
+    StateStore,
+    configure_logging,
+    load_domain_weights,
+    make_item_id,
+)
+from fetch_and_post_daily import build_candidates, dedupe_items
+from github_agent import GitHubAgent
+from promote_and_expire import W_ACC, W_AGE, W_ENG, W_PIN, apply_rules, next_transition, value_score
+from transition_index import TransitionIndex
+
+BENCHMARK_BASELINE_PATH = pathlib.Path(os.environ.get("BENCHMARK_BASELINE_PATH", "benchmarks/baseline.json"))
+DEFAULT_SIZES = (1_000, 10_000)
+STAGES = ("dedupe", "scoring", "state_load", "state_save", "value_scores", "promote_rules", "promote_scheduled", "markdown_sync_full", "markdown_sync_incremental")
+# Bu oranlardan fazla kötüleşme regresyon sayılır
+THROUGHPUT_TOLERANCE = 0.2
+MEMORY_TOLERANCE = 0.2
+# Artımlı Markdown senkronunda her turda değişen item oranı
+INCREMENTAL_DIRTY_RATIO = 0.01
+
+WORDS = (
+    "model language large open source agent benchmark reasoning vision multimodal training inference "
+    "chip gpu policy safety alignment release paper dataset startup funding robotics diffusion "
+    "transformer evaluation regulation copilot assistant coding search memory context token fine-tuning"
+).split()
+LONG_TAIL_DOMAINS = 500
+SOURCES = ("GDELT", "Google News", "Hacker News", "The Batch", "Import AI", "The Gradient")
+
+
+class SyntheticCorpus:
+    """Deterministic feed items and stored NewsItems with a realistic domain/duplicate mix.
+
+    About 10% of feed items repost an earlier URL (with tracking parameters) and 10%
+    rephrase an earlier title on another domain, so both dedupe paths are exercised.
+    """
+
+    def __init__(self, size: int, seed: int = 1, now: Optional[dt.datetime] = None) -> None:
+        self.size = size
+        self.rng = random.Random(seed)
+        self.now = now or dt.datetime(2024, 6, 1, tzinfo=dt.timezone.utc)
+        weights = load_domain_weights()
+        known = sorted(domain for domain in weights if domain != "__default__")
+        self.domains = known + [f"blog.{d}" for d in known] + [f"news{n}.example.com" for n in range(LONG_TAIL_DOMAINS)]
+
+    def _title(self) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(self.rng.randint(6, 12))).capitalize()
+
+    def _published(self, hours_ago: float) -> str:
+        published = self.now - dt.timedelta(hours=hours_ago)
+        kind = self.rng.random()
+        if kind < 0.4:
+            return published.strftime("%Y-%m-%dT%H:%M:%SZ")
+        if kind < 0.7:
+            return published.strftime("%a, %d %b %Y %H:%M:%S +0000")
+        return published.strftime("%Y%m%d%H%M%S")
+
+    def feed_items(self) -> List[Dict[str, str]]:
+        items: List[Dict[str, str]] = []
+        for n in range(self.size):
+            roll = self.rng.random()
+            if items and roll < 0.1:
+                original = self.rng.choice(items)
+                url, title = f"{original['url']}?utm_source=rss", original["title"]
+            elif items and roll < 0.2:
+                original = self.rng.choice(items)
+                words = original["title"].split()
+                words[self.rng.randrange(len(words))] = self.rng.choice(WORDS)
+                url, title = f"https://{self.rng.choice(self.domains)}/story/{n}", " ".join(words)
+            else:
+                url, title = f"https://{self.rng.choice(self.domains)}/{n // 1000}/article-{n}", self._title()
+            items.append({
+                "title": title,
+                "url": url,
+                "source": self.rng.choice(SOURCES),
+                "published": self._published(self.rng.uniform(0, 24)),
+            })
+        return items
+
+    def state_items(self) -> List[NewsItem]:
+        items: List[NewsItem] = []
+        for n in range(self.size):
+            url = f"https://{self.rng.choice(self.domains)}/{n // 1000}/article-{n}"
+            age_h = self.rng.uniform(0, 24 * 120)
+            published = self.now - dt.timedelta(hours=age_h)
+            posted = f"{(published + dt.timedelta(minutes=30)).timestamp():.6f}"
+            roll = self.rng.random()
+            status = "daily" if roll < 0.5 else "weekly" if roll < 0.75 else "monthly" if roll < 0.9 else "archived"
+            items.append(NewsItem(
+                id=make_item_id(url),
+                url=url,
+                title=self._title(),
+                source=self.rng.choice(SOURCES),
+                published_utc=published.isoformat(),
+                status=status,
+                accuracy=round(self.rng.uniform(0.4, 3.0), 3),
+                corroborations=self.rng.choice((0, 0, 0, 1, 1, 2, 3)),
+                meaning="AI news",
+                impact="General",
+                affected="General",
+                ts_daily=posted,
+                ts_weekly=posted if status != "daily" else None,
+                ts_monthly=posted if status in ("monthly", "archived") else None,
+                replies=self.rng.choice((0, 0, 1, 2, 3, 5, 8)),
+                pinned=self.rng.random() < 0.05,
+            ))
+        return items
+
+
+StageResult = Tuple[int, List[float]]
+
+
+def _timed_each(items, func: Callable) -> List[float]:
+    latencies: List[float] = []
+    clock = time.perf_counter
+    for item in items:
+        start = clock()
+        func(item)
+        latencies.append(clock() - start)
+    return latencies
+
+
+def stage_dedupe(corpus: SyntheticCorpus, workdir: pathlib.Path) -> Callable[[], StageResult]:
+    feed = corpus.feed_items()
+
+    def run() -> StageResult:
+        items = [dict(item) for item in feed]
+        start = time.perf_counter()
+        dedupe_items(items)
+        return len(items), [time.perf_counter() - start]
+
+    return run
+
+
+def stage_scoring(corpus: SyntheticCorpus, workdir: pathlib.Path) -> Callable[[], StageResult]:
+    deduped = dedupe_items(corpus.feed_items())
+    weights = load_domain_weights()
+
+    def run() -> StageResult:
+        # Puanlama toplu yapılır; kalem başı gecikme yerine partinin süresi ölçülür
+        start = time.perf_counter()
+        build_candidates(deduped, weights, corpus.now, 24)
+        return len(deduped), [time.perf_counter() - start]
+
+    return run
+
+
+def stage_state_load(corpus: SyntheticCorpus, workdir: pathlib.Path) -> Callable[[], StageResult]:
+    path = workdir / "load" / "items.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    store = StateStore(path, journal=False)
+    for item in corpus.state_items():
+        store.upsert(item)
+    store.save()
+
+    def run() -> StageResult:
+        target = StateStore(path, journal=False)
+        start = time.perf_counter()
+        target.load()
+        return len(target.values()), [time.perf_counter() - start]
+
+    return run
+
+
+def stage_state_save(corpus: SyntheticCorpus, workdir: pathlib.Path) -> Callable[[], StageResult]:
+    path = workdir / "save" / "items.jsonl"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    items = corpus.state_items()
+
+    def run() -> StageResult:
+        if path.exists():
+            path.unlink()
+        store = StateStore(path, journal=False)
+        for item in items:
+            store.upsert(item)
+        start = time.perf_counter()
+        store.save()
+        return len(items), [time.perf_counter() - start]
+
+    return run
+
+
+def stage_promote_rules(corpus: SyntheticCorpus, workdir: pathlib.Path) -> Callable[[], StageResult]:
+    snapshot = [item.to_json() for item in corpus.state_items()]
+    now = corpus.now
+
+    def evaluate(item: NewsItem) -> None:
+        item.value_score = value_score(item, now)
+        apply_rules((item,), now)
+
+    def run() -> StageResult:
+        items = [NewsItem.from_json(dict(data)) for data in snapshot]
+        return len(items), _timed_each(items, evaluate)
+
+    return run
+
+
+def stage_value_scores(corpus: SyntheticCorpus, workdir: pathlib.Path) -> Callable[[], StageResult]:
+    items = corpus.state_items()
+    columns = (
+        [item.accuracy for item in items],
+        [item.replies for item in items],
+        [item.pinned for item in items],
+        [item.published_epoch for item in items],
+    )
+
+    def run() -> StageResult:
+        start = time.perf_counter()
+        value_scores(*columns, corpus.now.timestamp(), (W_ACC, W_ENG, W_PIN, W_AGE))
+        return len(items), [time.perf_counter() - start]
+
+    return run
+
+
+def stage_promote_scheduled(corpus: SyntheticCorpus, workdir: pathlib.Path) -> Callable[[], StageResult]:
+    """Indexed promotion pass one cron interval (30 min) after a full pass."""
+    items = corpus.state_items()
+    for item in items:
+        item.value_score = value_score(item, corpus.now)
+    apply_rules(items, corpus.now)
+    index = TransitionIndex(workdir / "transitions.jsonl")
+    for item in items:
+        index.schedule(item, next_transition(item, corpus.now))
+    index.save()
+    snapshot = [item.to_json() for item in items]
+    now = corpus.now + dt.timedelta(minutes=30)
+
+    def run() -> StageResult:
+        items = [NewsItem.from_json(dict(data)) for data in snapshot]
+        store = _in_memory_store(items, workdir / "scheduled.jsonl")
+        index.load()
+        start = time.perf_counter()
+        due = index.pending(store, (), now.timestamp())
+        apply_rules(due, now)
+        for item in due:
+            index.schedule(item, next_transition(item, now))
+        return len(items), [time.perf_counter() - start]
+
+    return run
+
+
+@contextlib.contextmanager
+def _chdir(path: pathlib.Path) -> Iterator[None]:
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _in_memory_store(items: List[NewsItem], path: pathlib.Path) -> StateStore:
+    """Unsaved StateStore holding ``items`` for stages that take a store."""
+    store = StateStore(path)
+    for item in items:
+        store.upsert(item)
+    return store
+
+
+def stage_markdown_sync_full(corpus: SyntheticCorpus, workdir: pathlib.Path) -> Callable[[], StageResult]:
+    root = workdir / "markdown_full"
+    root.mkdir()
+    items = corpus.state_items()
+    store = _in_memory_store(items, workdir / "markdown_full.jsonl")
+    agent = GitHubAgent(token=None, repo=None)
+
+    def run() -> StageResult:
+        with _chdir(root):
+            start = time.perf_counter()
+            agent.sync_to_filesystem(store, full=True)
+            return len(items), [time.perf_counter() - start]
+
+    return run
+
+
+def stage_markdown_sync_incremental(corpus: SyntheticCorpus, workdir: pathlib.Path) -> Callable[[], StageResult]:
+    root = workdir / "markdown_incremental"
+    root.mkdir()
+    items = corpus.state_items()
+    store = _in_memory_store(items, workdir / "markdown_incremental.jsonl")
+    agent = GitHubAgent(token=None, repo=None)
+    with _chdir(root):
+        agent.sync_to_filesystem(store, full=True)
+    dirty_count = max(1, int(len(items) * INCREMENTAL_DIRTY_RATIO))
+
+    def run() -> StageResult:
+        dirty = corpus.rng.sample(items, dirty_count)
+        for item in dirty:
+            item.replies += 1
+            item.value_score = round(item.value_score + 0.001, 3)
+        with _chdir(root):
+            start = time.perf_counter()
+            agent.sync_to_filesystem(store, dirty_ids={item.id for item in dirty})
+            return len(items), [time.perf_counter() - start]
+
+    return run
+
+
+STAGE_SETUP: Dict[str, Callable[[SyntheticCorpus, pathlib.Path], Callable[[], StageResult]]] = {
+    "dedupe": stage_dedupe,
+    "scoring": stage_scoring,
+    "state_load": stage_state_load,
+    "state_save": stage_state_save,
+    "value_scores": stage_value_scores,
+    "promote_rules": stage_promote_rules,
+    "promote_scheduled": stage_promote_scheduled,
+    "markdown_sync_full": stage_markdown_sync_full,
+    "markdown_sync_incremental": stage_markdown_sync_incremental,
+}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def run_stage(stage: str, size: int, repeat: int, measure_memory: bool, seed: int) -> Dict[str, object]:
+    with tempfile.TemporaryDirectory(prefix=f"bench-{stage}-") as tmp:
+        corpus = SyntheticCorpus(size, seed=seed)
+        run = STAGE_SETUP[stage](corpus, pathlib.Path(tmp))
+        durations: List[float] = []
+        latencies: List[float] = []
+        ops = 0
+        for _ in range(repeat):
+            gc.collect()
+            ops, sample = run()
+            # Kurulum (kopyalama, dosya silme) hariç yalnızca ölçülen bölüm
+            durations.append(sum(sample))
+            latencies.extend(sample)
+        peak_mb: Optional[float] = None
+        if measure_memory:
+            # tracemalloc yavaşlatır; bellek ayrı bir turda ölçülür
+            gc.collect()
+            tracemalloc.start()
+            run()
+            peak_mb = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 2)
+            tracemalloc.stop()
+    seconds = statistics.median(durations)
+    return {
+        "stage": stage,
+        "size": size,
+        "ops": ops,
+        "seconds": round(seconds, 4),
+        "throughput": round(ops / seconds, 1) if seconds else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 4),
+            "p95": round(percentile(latencies, 95) * 1000, 4),
+            "p99": round(percentile(latencies, 99) * 1000, 4),
+            "max": round(max(latencies) * 1000, 4),
+        },
+        "peak_mem_mb": peak_mb,
+    }
+
+
+def compare(results: List[Dict[str, object]], baseline: Dict[str, object]) -> List[str]:
+    """Regressions of ``results`` against a baseline report, as human-readable lines."""
+    previous = {(r["stage"], r["size"]): r for r in baseline.get("results", [])}  # type: ignore[union-attr]
+    regressions: List[str] = []
+    for result in results:
+        old = previous.get((result["stage"], result["size"]))
+        if not old:
+            continue
+        label = f"{result['stage']}@{result['size']}"
+        if old.get("throughput") and result.get("throughput"):
+            ratio = result["throughput"] / old["throughput"]  # type: ignore[operator]
+            result["throughput_vs_baseline"] = round(ratio, 3)
+            if ratio < 1 - THROUGHPUT_TOLERANCE:
+                regressions.append(f"{label}: throughput {result['throughput']}/s vs baseline {old['throughput']}/s")
+        if old.get("peak_mem_mb") and result.get("peak_mem_mb"):
+            ratio = result["peak_mem_mb"] / old["peak_mem_mb"]  # type: ignore[operator]
+            result["memory_vs_baseline"] = round(ratio, 3)
+            if ratio > 1 + MEMORY_TOLERANCE:
+                regressions.append(f"{label}: peak memory {result['peak_mem_mb']} MB vs baseline {old['peak_mem_mb']} MB")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default=",".join(str(s) for s in DEFAULT_SIZES), help="Comma-separated item counts, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per stage and size (median is reported)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass that measures peak memory")
+    parser.add_argument("--output", type=pathlib.Path, help="Write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", type=pathlib.Path, default=BENCHMARK_BASELINE_PATH, help="Baseline report to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this report as the new baseline")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    # Aşamaların kendi INFO logları ölçümü boğmasın
+    logging.getLogger().setLevel(max(logging.getLogger().level, logging.WARNING))
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    stages = [s for s in args.stages.split(",") if s]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+
+    results: List[Dict[str, object]] = []
+    for size in sizes:
+        for stage in stages:
+            result = run_stage(stage, size, max(1, args.repeat), not args.no_memory, args.seed)
+            print(f"{stage:>26} {size:>8}: {result['seconds']:.3f}s {result['throughput']}/s", file=sys.stderr)
+            results.append(result)
+
+    report: Dict[str, object] = {
+        "generated_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    regressions: List[str] = []
+    if args.baseline.exists() and not args.save_baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")))
+        report["regressions"] = regressions
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(text + "\n", encoding="utf-8")
+        print(f"Saved baseline to {args.baseline}", file=sys.stderr)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,16 +8,28 @@ import json
 import logging
 import os
 import pathlib
-from typing import Dict, Iterable, List, Optional
+import sys
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set
 from urllib.parse import parse_qs, urlparse, urlunparse
 
-import yaml
-
 STATE_PATH = pathlib.Path(os.environ.get("STATE_PATH", "state/items.jsonl"))
 DOMAIN_WEIGHTS_PATH = pathlib.Path(os.environ.get("DOMAIN_WEIGHTS_PATH", "domain_weights.yml"))
+STATE_BACKEND = os.environ.get("STATE_BACKEND", "jsonl").lower()
+STATE_JOURNAL = os.environ.get("STATE_JOURNAL", "").lower() in ("1", "true", "yes")
+STATE_JOURNAL_MAX_BYTES = int(os.environ.get("STATE_JOURNAL_MAX_BYTES", str(4 * 1024 * 1024)))
+STATE_JOURNAL_RATIO = float(os.environ.get("STATE_JOURNAL_RATIO", "0.5"))
+
+
+def intern_text(value: object) -> str:
+    """Interned ``str`` for a categorical field; ``None`` becomes ``""``, other values ``str()``."""
+    # Eski state satırlarında LLM'in döndürdüğü null/liste değerleri olabilir
+    if not isinstance(value, str):
+        value = "" if value is None else str(value)
+    return sys.intern(value)
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class NewsItem:
     id: str
     url: str
@@ -36,45 +48,275 @@ class NewsItem:
     replies: int = 0
     pinned: bool = False
     value_score: float = 0.0
+    # Sıralama/yaş/TTL için epoch saniyeleri; string alanlar Markdown ve Slack API için kalır
+    published_epoch: Optional[float] = None
+    ts_daily_epoch: Optional[float] = None
+    ts_weekly_epoch: Optional[float] = None
+    ts_monthly_epoch: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        # Kategorik alanlar birkaç düzine değer tekrarlar; her değerin tek kopyası tutulur
+        self.status = intern_text(self.status)
+        self.source = intern_text(self.source)
+        self.meaning = intern_text(self.meaning)
+        self.impact = intern_text(self.impact)
+        self.affected = intern_text(self.affected)
+        # Yalnızca eksikse (yeni kalem ya da eski state satırı) bir kez hesaplanır
+        if self.published_epoch is None:
+            self.published_epoch = datetime_epoch(self.published_utc)
+        if self.ts_daily_epoch is None:
+            self.ts_daily_epoch = slack_ts_epoch(self.ts_daily)
+        if self.ts_weekly_epoch is None:
+            self.ts_weekly_epoch = slack_ts_epoch(self.ts_weekly)
+        if self.ts_monthly_epoch is None:
+            self.ts_monthly_epoch = slack_ts_epoch(self.ts_monthly)
+
+    def set_slack_ts(self, status: str, ts: Optional[str]) -> None:
+        """Record the Slack message ``ts`` of ``status`` together with its epoch field."""
+        setattr(self, f"ts_{status}", ts)
+        setattr(self, f"ts_{status}_epoch", slack_ts_epoch(ts))
+
+    def set_enrichment(self, meaning: str, impact: str, affected: str) -> None:
+        """Set the LLM enrichment fields, interned like the constructor does."""
+        self.meaning = intern_text(meaning)
+        self.impact = intern_text(impact)
+        self.affected = intern_text(affected)
 
     def to_json(self) -> Dict[str, object]:
-        return dataclasses.asdict(self)
+        # asdict() her değeri özyinelemeli kopyalar; alanlar düz değer olduğundan gerek yok.
+        # Anahtar sırası alan sırasıyla aynı kalmalı: state satırları bayt bayt karşılaştırılır.
+        return {
+            "id": self.id,
+            "url": self.url,
+            "title": self.title,
+            "source": self.source,
+            "published_utc": self.published_utc,
+            "status": self.status,
+            "accuracy": self.accuracy,
+            "corroborations": self.corroborations,
+            "meaning": self.meaning,
+            "impact": self.impact,
+            "affected": self.affected,
+            "ts_daily": self.ts_daily,
+            "ts_weekly": self.ts_weekly,
+            "ts_monthly": self.ts_monthly,
+            "replies": self.replies,
+            "pinned": self.pinned,
+            "value_score": self.value_score,
+            "published_epoch": self.published_epoch,
+            "ts_daily_epoch": self.ts_daily_epoch,
+            "ts_weekly_epoch": self.ts_weekly_epoch,
+            "ts_monthly_epoch": self.ts_monthly_epoch,
+        }
 
     @staticmethod
-    def from_json(data: Dict[str, object]) -> "NewsItem":
-        # value_score geri uyumluluk
-        data.setdefault("value_score", 0.0)
-        return NewsItem(**data)
+    def from_json(data: Dict[str, Any]) -> "NewsItem":
+        get = data.get
+        return NewsItem(
+            data["id"],
+            data["url"],
+            data["title"],
+            data["source"],
+            data["published_utc"],
+            data["status"],
+            data["accuracy"],
+            data["corroborations"],
+            data["meaning"],
+            data["impact"],
+            data["affected"],
+            get("ts_daily"),
+            get("ts_weekly"),
+            get("ts_monthly"),
+            get("replies", 0),
+            get("pinned", False),
+            get("value_score", 0.0),  # value_score geri uyumluluk
+            get("published_epoch"),
+            get("ts_daily_epoch"),
+            get("ts_weekly_epoch"),
+            get("ts_monthly_epoch"),
+        )
+
+    @staticmethod
+    def needs_migration(data: Dict[str, object]) -> bool:
+        """True for state records written before the epoch fields existed."""
+        return "published_epoch" not in data
 
 
 class StateStore:
-    def __init__(self, path: pathlib.Path = STATE_PATH) -> None:
+    """Item state persisted as a JSONL snapshot plus an optional append-only journal.
+
+    In journal mode ``save`` appends only changed items (``{"op": "upsert", "item": ...}``)
+    and removals (``{"op": "remove", "id": ...}``) to ``<path>.journal``; ``load`` replays
+    the journal over the snapshot. Once the journal outgrows ``STATE_JOURNAL_MAX_BYTES`` or
+    ``STATE_JOURNAL_RATIO`` times the item count, it is folded back into the snapshot on a
+    background thread. Change detection keeps only a 128-bit digest of each item's persisted line.
+    """
+
+    def __init__(self, path: pathlib.Path = STATE_PATH, journal: bool = STATE_JOURNAL) -> None:
         self.path = path
+        self.journal_path = path.with_suffix(path.suffix + ".journal")
+        self.journal = journal
         self._items: Dict[str, NewsItem] = {}
+        self._persisted: Dict[str, bytes] = {}
+        self._changed: Set[str] = set()
+        self._journal_records = 0
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
 
     def load(self) -> None:
         self._items.clear()
-        if not self.path.exists():
+        self._persisted.clear()
+        self._changed.clear()
+        self._journal_records = 0
+        if not self.path.exists() and not self.journal_path.exists():
             logging.debug("State file %s does not exist; starting fresh", self.path)
             return
-        with self.path.open("r", encoding="utf-8") as f:
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    item = NewsItem.from_json(json.loads(line))
+                    self._items[item.id] = item
+                    # Kendi yazdığımız satır _dump_item çıktısıyla aynıdır; yeniden serileştirmeye gerek yok
+                    self._persisted[item.id] = _line_digest(line)
+        if self.journal_path.exists():
+            self._replay_journal()
+        logging.info("Loaded %d items from state", len(self._items))
+
+    def _replay_journal(self) -> None:
+        with self.journal_path.open("r", encoding="utf-8") as f:
             for line in f:
                 line = line.strip()
                 if not line:
                     continue
-                data = json.loads(line)
-                item = NewsItem.from_json(data)
-                self._items[item.id] = item
-        logging.info("Loaded %d items from state", len(self._items))
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Yarım kalmış son satır (kesilen çalışma) yok sayılır
+                    logging.warning("Skipping truncated journal record in %s", self.journal_path)
+                    continue
+                self._journal_records += 1
+                if record.get("op") == "remove":
+                    self._items.pop(record["id"], None)
+                    self._persisted.pop(record["id"], None)
+                else:
+                    item = NewsItem.from_json(record["item"])
+                    self._items[item.id] = item
+                    self._persisted[item.id] = _line_digest(_dump_item(item))
 
     def save(self) -> None:
+        if self.journal:
+            self._append_journal()
+            return
+        self.wait_for_compaction()
+        hashes: Dict[str, bytes] = {}
+
+        def lines() -> Iterable[str]:
+            # Satırlar bellekte biriktirilmeden yazılır
+            for item in self._items.values():
+                line = _dump_item(item)
+                hashes[item.id] = _line_digest(line)
+                yield line
+
+        self._write_snapshot(lines())
+        self._track_changes(hashes)
+        if self.journal_path.exists():
+            self.journal_path.unlink()
+        self._persisted = hashes
+        self._journal_records = 0
+        logging.info("Persisted %d items to %s", len(self._items), self.path)
+
+    def _write_snapshot(self, lines: Iterable[str]) -> None:
         temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
         with temp_path.open("w", encoding="utf-8") as f:
-            for item in self._items.values():
-                json.dump(item.to_json(), f, ensure_ascii=False)
+            for line in lines:
+                f.write(line)
                 f.write("\n")
         temp_path.replace(self.path)
-        logging.info("Persisted %d items to %s", len(self._items), self.path)
+
+    def _append_journal(self) -> None:
+        records: List[str] = []
+        current: Dict[str, bytes] = {}
+        for item in self._items.values():
+            line = _dump_item(item)
+            key = current[item.id] = _line_digest(line)
+            if self._persisted.get(item.id) != key:
+                records.append(f'{{"op": "upsert", "item": {line}}}')
+        for item_id in self._persisted.keys() - current.keys():
+            records.append(json.dumps({"op": "remove", "id": item_id}))
+        self._track_changes(current)
+        with self._lock:
+            if records:
+                with self.journal_path.open("a", encoding="utf-8") as f:
+                    f.write("\n".join(records) + "\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+            self._persisted = current
+            self._journal_records += len(records)
+        logging.info("Journaled %d changes (%d items) to %s", len(records), len(current), self.journal_path)
+        if self._needs_compaction():
+            self.compact(background=True)
+
+    def _track_changes(self, hashes: Dict[str, bytes]) -> None:
+        self._changed.update(item_id for item_id, key in hashes.items() if self._persisted.get(item_id) != key)
+        self._changed.update(self._persisted.keys() - hashes.keys())
+
+    def changed_ids(self) -> Set[str]:
+        """IDs upserted, modified or removed since ``load``, as of the last ``save``."""
+        return set(self._changed)
+
+    def clear_changed_ids(self) -> None:
+        """Forget tracked changes once they have been synced (long-running processes)."""
+        self._changed.clear()
+
+    def _needs_compaction(self) -> bool:
+        if not self.journal_path.exists():
+            return False
+        if self.journal_path.stat().st_size >= STATE_JOURNAL_MAX_BYTES:
+            return True
+        return self._journal_records > max(len(self._items), 1) * STATE_JOURNAL_RATIO
+
+    def compact(self, background: bool = False) -> None:
+        """Fold the journal into the snapshot, keeping records appended meanwhile.
+
+        Called right after a journal append, when the in-memory items match what is on disk.
+        """
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        with self._lock:
+            lines = [_dump_item(item) for item in self._items.values()]
+            offset = self.journal_path.stat().st_size if self.journal_path.exists() else 0
+            records = self._journal_records
+
+        def run() -> None:
+            self._write_snapshot(lines)
+            with self._lock:
+                tail = b""
+                if self.journal_path.exists():
+                    with self.journal_path.open("rb") as f:
+                        f.seek(offset)
+                        tail = f.read()
+                if tail:
+                    temp_path = self.journal_path.with_suffix(self.journal_path.suffix + ".tmp")
+                    temp_path.write_bytes(tail)
+                    temp_path.replace(self.journal_path)
+                elif self.journal_path.exists():
+                    self.journal_path.unlink()
+                self._journal_records -= records
+            logging.info("Compacted %d journal records into %s", records, self.path)
+
+        if background:
+            self._compactor = threading.Thread(target=run, name="state-compactor")
+            self._compactor.start()
+        else:
+            run()
+
+    def wait_for_compaction(self) -> None:
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
 
     def upsert(self, item: NewsItem) -> None:
         self._items[item.id] = item
@@ -85,10 +327,50 @@ class StateStore:
     def values(self) -> Iterable[NewsItem]:
         return list(self._items.values())
 
+    def ids(self) -> Set[str]:
+        return set(self._items)
+
     def remove(self, item_id: str) -> None:
         if item_id in self._items:
             del self._items[item_id]
 
+    def by_status(self, status: str) -> List[NewsItem]:
+        """Items with ``status``, newest first."""
+        items = [item for item in self._items.values() if item.status == status]
+        items.sort(key=published_sort_key, reverse=True)
+        return items
+
+    def posted_before(self, status: str, cutoff_ts: float) -> List[NewsItem]:
+        """Items in ``status`` whose Slack post for that status is at or before ``cutoff_ts``."""
+        field = f"ts_{status}_epoch"
+        return [item for item in self._items.values() if item.status == status and (getattr(item, field) or float("inf")) <= cutoff_ts]
+
+    def published_before(self, status: str, cutoff_ts: float) -> List[NewsItem]:
+        """Items in ``status`` published at or before ``cutoff_ts``."""
+        return [
+            item
+            for item in self._items.values()
+            if item.status == status and item.published_epoch is not None and item.published_epoch <= cutoff_ts
+        ]
+
+
+def open_state_store() -> StateStore:
+    """Return the configured state backend (``STATE_BACKEND=jsonl|sqlite``)."""
+    if STATE_BACKEND == "sqlite":
+        from sqlite_store import SQLiteStateStore
+
+        return SQLiteStateStore()  # type: ignore[return-value]
+    return StateStore()
+
+
+def _dump_item(item: NewsItem) -> str:
+    return json.dumps(item.to_json(), ensure_ascii=False)
+
+
+def _line_digest(line: str) -> bytes:
+    # hash() 64 bit ve süreç başına tuzlu; çakışma değişen kalemi sessizce atlatırdı
+    return hashlib.blake2b(line.encode("utf-8"), digest_size=16).digest()
+
 
 def configure_logging() -> None:
     logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO"), format="%(asctime)s %(levelname)s %(message)s")
@@ -133,23 +415,79 @@ def to_utc(dt_value: dt.datetime) -> dt.datetime:
     return dt_value.astimezone(dt.timezone.utc)
 
 
-def load_domain_weights(path: pathlib.Path = DOMAIN_WEIGHTS_PATH) -> Dict[str, float]:
+def datetime_epoch(value: Optional[str]) -> Optional[float]:
+    """Epoch seconds of a stored ``published_utc`` value (naive values are UTC)."""
+    if not value:
+        return None
+    try:
+        return to_utc(parse_datetime(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def slack_ts_epoch(ts: Optional[str]) -> Optional[float]:
+    if not ts:
+        return None
+    try:
+        return float(ts)
+    except ValueError:
+        return None
+
+
+def published_sort_key(item: NewsItem) -> float:
+    return item.published_epoch if item.published_epoch is not None else 0.0
+
+
+class DomainWeights(Dict[str, float]):
+    """Domain weights with the suffix walk compiled once.
+
+    Lookups only try the suffix lengths (label counts) that occur in the configured
+    domains, longest first, and each host's weight is memoized.
+    """
+
+    def __init__(self, weights: Dict[str, float]) -> None:
+        super().__init__(weights)
+        self.default = self.get("__default__", 0.4)
+        self._depths = sorted({domain.count(".") + 1 for domain in self if domain != "__default__"}, reverse=True)
+        self._hosts: Dict[str, float] = {}
+
+    def for_host(self, host: str) -> float:
+        weight = self._hosts.get(host)
+        if weight is None:
+            weight = self._hosts[host] = self._lookup(host)
+        return weight
+
+    def _lookup(self, host: str) -> float:
+        labels = host.split(".")
+        for depth in self._depths:
+            if depth <= len(labels):
+                suffix = ".".join(labels[-depth:])
+                if suffix in self:
+                    return self[suffix]
+        return self.default
+
+
+def load_domain_weights(path: pathlib.Path = DOMAIN_WEIGHTS_PATH) -> DomainWeights:
     default_weight = 0.4
     weights: Dict[str, float] = {}
     if not path.exists():
         logging.warning("Domain weights file %s not found. Using default weight %s", path, default_weight)
-        return {"__default__": default_weight}
+        return DomainWeights({"__default__": default_weight})
+    import yaml  # yalnızca ağırlık dosyası okunurken gerekir; açılış süresini kısaltır
+
     with path.open("r", encoding="utf-8") as f:
         data = yaml.safe_load(f) or {}
     default_weight = float(data.get("default", default_weight))
     for domain, weight in (data.get("weights") or {}).items():
         weights[domain.lower()] = float(weight)
     weights["__default__"] = default_weight
-    return weights
+    return DomainWeights(weights)
 
 
 def domain_weight_for(url: str, weights: Dict[str, float]) -> float:
     domain = urlparse(url).netloc.lower()
+    if isinstance(weights, DomainWeights):
+        return weights.for_host(domain)
     while domain:
         if domain in weights:
             return weights[domain]
@@ -189,5 +527,5 @@ def group_by_status(items: Iterable[NewsItem]) -> Dict[str, List[NewsItem]]:
     for item in items:
         buckets.setdefault(item.status, []).append(item)
     for bucket in buckets.values():
-        bucket.sort(key=lambda x: x.published_utc, reverse=True)
+        bucket.sort(key=published_sort_key, reverse=True)
     return buckets
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""Long-running pipeline with resident state, per-source polling and timed promotion."""
+from __future__ import annotations
+
+import argparse
+import heapq
+import logging
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import promote_and_expire
+from common import configure_logging, load_domain_weights, open_state_store
+from fetch_and_post_daily import (
+    DEFAULT_LOOKBACK_HOURS,
+    OPENAI_API_KEY,
+    SLACK_BOT_TOKEN,
+    EnrichmentCache,
+    FeedCache,
+    FeedFetcher,
+    SlackClient,
+    Source,
+    post_new_items,
+    reconcile_postings,
+)
+from github_agent import GitHubAgent
+from posting_journal import PostingJournal
+from run_metrics import metrics
+from seen_ids import SeenIds
+from slack_transport import SlackTransport
+from transition_index import TransitionIndex
+
+# Kaynak adı=saniye listesi, ör. "GDELT=120,Hacker News=300"
+DAEMON_POLL_INTERVALS = os.environ.get("DAEMON_POLL_INTERVALS", "")
+DAEMON_DEFAULT_INTERVAL = float(os.environ.get("DAEMON_DEFAULT_INTERVAL", "3600"))
+DAEMON_JITTER = float(os.environ.get("DAEMON_JITTER", "0.1"))
+DAEMON_PROMOTE_INTERVAL = float(os.environ.get("DAEMON_PROMOTE_INTERVAL", "1800"))
+DAEMON_SAVE_INTERVAL = float(os.environ.get("DAEMON_SAVE_INTERVAL", "300"))
+# Dakikalık güncellenen kaynaklar; bültenler DAEMON_DEFAULT_INTERVAL ile kalır
+DEFAULT_POLL_INTERVALS = {"GDELT": 300.0, "Hacker News": 300.0, "Google News": 600.0}
+
+
+def poll_intervals(spec: str = DAEMON_POLL_INTERVALS) -> Dict[str, float]:
+    intervals = dict(DEFAULT_POLL_INTERVALS)
+    for part in spec.split(","):
+        name, sep, seconds = part.rpartition("=")
+        if sep and name.strip():
+            intervals[name.strip()] = float(seconds)
+    return intervals
+
+
+Task = Tuple[float, int, str, float, Callable[[], None]]
+
+
+class PipelineDaemon:
+    """Keeps state, HTTP sessions, caches and domain weights in memory between polls.
+
+    Each source is fetched on its own interval (with jitter) and fresh items are posted
+    straight away; fetched items stay in a lookback window so corroborations across
+    sources still count. Promotion/expiry and persistence run on their own timers, and
+    state is saved on shutdown (SIGTERM/SIGINT).
+    """
+
+    def __init__(self, dry_run: bool = False, lookback_hours: int = DEFAULT_LOOKBACK_HOURS) -> None:
+        self.dry_run = dry_run
+        self.lookback_hours = lookback_hours
+        token = None if dry_run else SLACK_BOT_TOKEN
+        transport = SlackTransport(token)
+        self.slack = SlackClient(token, transport)
+        self.slack_metrics = promote_and_expire.SlackMetricsClient(token, transport)
+        self.agent = GitHubAgent(token=os.environ.get("GITHUB_TOKEN"), repo=os.environ.get("GITHUB_REPOSITORY"))
+        self.store = open_state_store()
+        self.seen = SeenIds()
+        self.transitions = TransitionIndex(rules=promote_and_expire.RULES_SIGNATURE) if promote_and_expire.USE_TRANSITION_INDEX else None
+        self.journal = PostingJournal()
+        self.feed_cache = FeedCache()
+        self.enrich_cache = EnrichmentCache()
+        self.fetcher = FeedFetcher(lookback_hours=lookback_hours, cache=self.feed_cache)
+        self.weights: Dict[str, float] = {}
+        self.window: Dict[Tuple[str, str], Tuple[float, Dict[str, str]]] = {}
+        self._tasks: List[Task] = []
+        self._seq = 0
+        self._rng = random.Random()
+        self._stop = threading.Event()
+
+    def load(self) -> None:
+        self.store.load()
+        self.seen.load()
+        if self.transitions is not None:
+            self.transitions.load()
+        self.feed_cache.load()
+        self.enrich_cache.load()
+        self.weights = load_domain_weights()
+        reconcile_postings(self.journal, self.store, self.seen, self.slack)
+
+    def schedule(self, name: str, interval: float, fn: Callable[[], None], delay: float) -> None:
+        self._seq += 1
+        heapq.heappush(self._tasks, (time.monotonic() + delay, self._seq, name, interval, fn))
+
+    def _jittered(self, interval: float) -> float:
+        return interval * (1 + self._rng.uniform(-DAEMON_JITTER, DAEMON_JITTER))
+
+    def poll(self, source: Source) -> None:
+        with metrics.span(f"daemon.poll.{source[0]}"):
+            fetched = self.fetcher.fetch_sources([source])
+            now = time.time()
+            cutoff = now - self.lookback_hours * 3600
+            # Aynı kaynaktan tekrar gelen haber yeni bir teyit sayılmaz
+            self.window = {key: entry for key, entry in self.window.items() if entry[0] >= cutoff}
+            for item in fetched:
+                self.window[(item.get("source", ""), item.get("url", ""))] = (now, item)
+            metrics.count("items.fetched", len(fetched))
+            if not fetched:
+                return
+            # dedupe_items kalemleri değiştirir; pencere kopyası üzerinden çalışılır
+            raw_items = [dict(item) for _, item in self.window.values()]
+            post_new_items(raw_items, self.store, self.seen, self.slack, self.journal, self.weights, self.lookback_hours, self.enrich_cache)
+
+    def promote(self) -> None:
+        with metrics.span("daemon.promote"):
+            promote_and_expire.run_cycle(self.store, self.seen, self.slack_metrics, self.agent, dry_run=self.dry_run, index=self.transitions)
+            # run_cycle state'i kaydetti; gönderilen her şey artık kalıcı
+            self.journal.clear()
+            self.store.clear_changed_ids()
+
+    def persist(self) -> None:
+        with metrics.span("daemon.persist"):
+            self.store.save()
+            self.seen.save()
+            self.journal.clear()
+            self.feed_cache.save()
+            if OPENAI_API_KEY:
+                self.enrich_cache.save()
+        if self.slack.token:
+            self.slack.transport.log_summary()
+        metrics.write(metrics.snapshot("daemon", True))
+        metrics.reset()
+
+    def stop(self, *_args) -> None:
+        logging.info("Shutdown requested; persisting state")
+        self._stop.set()
+
+    def run(self, max_tasks: Optional[int] = None) -> None:
+        intervals = poll_intervals()
+        for source in self.fetcher.sources():
+            interval = intervals.get(source[0], DAEMON_DEFAULT_INTERVAL)
+            # İlk turlar dağıtılır ki tüm kaynaklar aynı anda vurulmasın
+            self.schedule(f"poll {source[0]}", interval, lambda source=source: self.poll(source), self._rng.uniform(0, min(interval, 60)))
+        self.schedule("promote", DAEMON_PROMOTE_INTERVAL, self.promote, DAEMON_PROMOTE_INTERVAL * DAEMON_JITTER)
+        self.schedule("persist", DAEMON_SAVE_INTERVAL, self.persist, DAEMON_SAVE_INTERVAL)
+        logging.info("Daemon started with %d scheduled tasks", len(self._tasks))
+        executed = 0
+        try:
+            while self._tasks and not self._stop.is_set():
+                due, _, name, interval, fn = heapq.heappop(self._tasks)
+                if self._stop.wait(max(due - time.monotonic(), 0)):
+                    break
+                logging.debug("Running daemon task %s", name)
+                try:
+                    fn()
+                except Exception:
+                    logging.exception("Daemon task %s failed", name)
+                    metrics.count("daemon.task_failures")
+                self.schedule(name, interval, fn, self._jittered(interval))
+                executed += 1
+                if max_tasks is not None and executed >= max_tasks:
+                    break
+        finally:
+            self.persist()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true", help="Do not post to Slack or open PRs")
+    parser.add_argument("--max-tasks", type=int, help="Exit after this many scheduled tasks (for testing)")
+    args = parser.parse_args()
+    configure_logging()
+    daemon = PipelineDaemon(dry_run=args.dry_run)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.load()
+    daemon.run(max_tasks=args.max_tasks)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,26 +3,44 @@ from __future__ import annotations
 
 import argparse
 import datetime as dt
+import email.utils
+import hashlib
+import html
+import io
 import json
 import logging
 import os
+import pathlib
 import re
-from typing import Dict, Iterable, List, Optional, Tuple
-from urllib.parse import urlencode
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import partial
+from typing import IO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import urlencode, urlparse
 
 import requests
 
+import http_replay
+from batch_scoring import candidate_scores
 from common import (
+    STATE_PATH,
     NewsItem,
     StateStore,
-    compute_accuracy,
-    compute_recency_score,
     configure_logging,
-    domain_weight_for,
     load_domain_weights,
     make_item_id,
     normalize_url,
+    open_state_store,
+    parse_datetime,
+    to_utc,
 )
+from near_duplicates import MIN_TOKENS, MinHashLSH, title_tokens
+from posting_journal import PostingJournal
+from run_metrics import metrics
+from seen_ids import SeenIds
+from slack_transport import SlackTransport
 
 USER_AGENT = "ai-news-pipeline/1.0"
 DEFAULT_LOOKBACK_HOURS = int(os.environ.get("LOOKBACK_HOURS", "12"))
@@ -36,31 +54,55 @@ SLACK_CH_DAILY = os.environ.get("SLACK_CH_DAILY", "#ai-daily")
 LLM_MODEL = os.environ.get("LLM_MODEL", "gpt-4.1-mini")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
+# Kaynaklar paralel çekilir; her kaynak kendi süresini, tüm fetch ise toplam süreyi aşamaz.
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", "8"))
+FETCH_SOURCE_TIMEOUT = float(os.environ.get("FETCH_SOURCE_TIMEOUT", "30"))
+FETCH_DEADLINE = float(os.environ.get("FETCH_DEADLINE", "120"))
+DEDUPE_SIMILARITY = float(os.environ.get("DEDUPE_SIMILARITY", "0.7"))
+ENRICH_CACHE_PATH = pathlib.Path(os.environ.get("ENRICH_CACHE_PATH", str(STATE_PATH.parent / "enrichment_cache.json")))
+ENRICH_CACHE_MAX_ENTRIES = int(os.environ.get("ENRICH_CACHE_MAX_ENTRIES", "5000"))
+ENRICH_CACHE_MAX_AGE_DAYS = float(os.environ.get("ENRICH_CACHE_MAX_AGE_DAYS", "14"))
+# Prompt değişince artırın; eski cache kayıtları otomatik geçersiz olur
+ENRICH_PROMPT_VERSION = "1"
+ENRICH_OUTPUT_TOKENS_PER_ITEM = 30
+ENRICH_PROMPT_OVERHEAD_TOKENS = 250
+ENRICH_CHUNK_TOKENS = int(os.environ.get("ENRICH_CHUNK_TOKENS", "4000"))
+ENRICH_MAX_IN_FLIGHT = int(os.environ.get("ENRICH_MAX_IN_FLIGHT", "4"))
+ENRICH_RETRIES = int(os.environ.get("ENRICH_RETRIES", "2"))
+ENRICH_BACKOFF_SECONDS = float(os.environ.get("ENRICH_BACKOFF_SECONDS", "2"))
+FEED_STALE_STREAK = int(os.environ.get("FEED_STALE_STREAK", "10"))
+FEED_CACHE_PATH = pathlib.Path(os.environ.get("FEED_CACHE_PATH", str(STATE_PATH.parent / "feed_cache.json")))
+
+CURATED_FEEDS = {
+    "The Rundown AI": "https://www.therundown.ai/feed",
+    "Ben's Bites": "https://www.bensbites.co/feed",
+    "TLDR AI": "https://www.tldrnewsletter.com/ai/rss",
+}
+
 AI_DOMAINS = {
     "openai.com", "deepmind.com", "deepmind.google", "anthropic.com", "huggingface.co", "stability.ai",
     "cohere.ai", "nvidia.com", "research.google", "googleblog.com", "ai.facebook.com", "meta.com",
 }
+# Gönderilen her mesaj item id'siyle etiketlenir; yarım kalan gönderiler buna göre bulunur
+SLACK_METADATA_EVENT = "ai_news_item"
 
 class SlackClient:
     """Lightweight Slack client that no-ops when credentials are missing."""
 
-    def __init__(self, token: Optional[str]) -> None:
+    def __init__(self, token: Optional[str], transport: Optional[SlackTransport] = None) -> None:
         self.token = token
-        self.session = requests.Session()
-        self.session.headers.update({"User-Agent": USER_AGENT})
+        self.transport = transport or SlackTransport(token)
 
-    def post_message(self, channel: str, text: str, blocks: Optional[List[Dict]] = None) -> Optional[str]:
+    def post_message(self, channel: str, text: str, blocks: Optional[List[Dict]] = None, item_id: Optional[str] = None) -> Optional[str]:
         if not self.token:
             logging.info("[DRY RUN] Would post to %s: %s", channel, text[:120])
             return None
-        url = "https://slack.com/api/chat.postMessage"
         payload = {"channel": channel, "text": text}
         if blocks:
             payload["blocks"] = json.dumps(blocks)
-        headers = {"Authorization": f"Bearer {self.token}"}
-        response = self.session.post(url, data=payload, headers=headers, timeout=30)
-        response.raise_for_status()
-        data = response.json()
+        if item_id:
+            payload["metadata"] = json.dumps({"event_type": SLACK_METADATA_EVENT, "event_payload": {"item_id": item_id}})
+        data = self.transport.call("chat.postMessage", data=payload)
         if not data.get("ok"):
             error = data.get("error", "unknown_error")
             if error == "not_in_channel":
@@ -69,6 +111,35 @@ class SlackClient:
             raise RuntimeError(f"Slack error: {data}")
         return data.get("ts")
 
+    def find_message(self, channel: str, item: NewsItem, oldest: float) -> Optional[str]:
+        """Return the ts of a message for ``item`` posted to ``channel`` since ``oldest``.
+
+        Messages are matched on the item id in their metadata; untagged messages fall back
+        to the title or URL, compared after undoing Slack's ``&amp;``/``&lt;``/``&gt;`` escaping.
+        """
+        if not self.token:
+            return None
+        params: Dict[str, object] = {"channel": channel, "oldest": f"{oldest:.6f}", "limit": 200, "include_all_metadata": "true"}
+        while True:
+            data = self.transport.call("conversations.history", "GET", params=params)
+            if not data.get("ok"):
+                logging.warning("Could not read %s history to reconcile postings: %s", channel, data.get("error"))
+                return None
+            for message in data.get("messages", []):
+                metadata = message.get("metadata") or {}
+                if metadata.get("event_type") == SLACK_METADATA_EVENT:
+                    if (metadata.get("event_payload") or {}).get("item_id") == item.id:
+                        return message.get("ts")
+                    continue
+                text = html.unescape(message.get("text") or "")
+                blocks = html.unescape(json.dumps(message.get("blocks", []), ensure_ascii=False))
+                if text == item.title or item.url in blocks:
+                    return message.get("ts")
+            cursor = (data.get("response_metadata") or {}).get("next_cursor")
+            if not cursor:
+                return None
+            params["cursor"] = cursor
+
 
 def _looks_ai_related(title: str, source: str, url: str) -> bool:
     t = (title or "").lower()
@@ -78,22 +149,201 @@ def _looks_ai_related(title: str, source: str, url: str) -> bool:
     return host in AI_DOMAINS
 
 
+class FeedCache:
+    """Persistent HTTP validator cache for RSS/Atom feeds, keyed by feed URL.
+
+    Each entry keeps the ETag/Last-Modified validators, a hash of the last body and
+    the items parsed from it, so an unchanged feed costs neither bandwidth nor parsing.
+    """
+
+    def __init__(self, path: pathlib.Path = FEED_CACHE_PATH) -> None:
+        self.path = path
+        self._entries: Dict[str, Dict[str, object]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.stats = {"requests": 0, "not_modified": 0, "unchanged": 0, "parsed": 0, "bytes_downloaded": 0, "bytes_saved": 0}
+
+    def load(self) -> None:
+        self._entries.clear()
+        if not self.path.exists():
+            return
+        try:
+            self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except ValueError as exc:
+            logging.warning("Feed cache %s is unreadable; starting fresh: %s", self.path, exc)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with self._lock:
+            temp_path.write_text(json.dumps(self._entries, ensure_ascii=False, indent=2, sort_keys=True), encoding="utf-8")
+            self._dirty = False
+        temp_path.replace(self.path)
+
+    def request_headers(self, url: str) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        with self._lock:
+            self.stats["requests"] += 1
+            entry = self._entries.get(url)
+        if not entry:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = str(entry["etag"])
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = str(entry["last_modified"])
+        return headers
+
+    def not_modified(self, url: str) -> Optional[List[Dict[str, str]]]:
+        """Return cached items for a 304 response, or ``None`` when nothing is cached."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            self.stats["not_modified"] += 1
+            self.stats["bytes_saved"] += int(entry.get("size", 0))
+            return [dict(item) for item in entry.get("items", [])]
+
+    def unchanged(self, url: str, response: requests.Response, body_hash: str) -> Optional[List[Dict[str, str]]]:
+        """Return cached items when the body matches the previous run, refreshing validators."""
+        with self._lock:
+            self.stats["bytes_downloaded"] += len(response.content)
+            entry = self._entries.get(url)
+            if entry is None or entry.get("body_hash") != body_hash:
+                return None
+            self.stats["unchanged"] += 1
+            self._update_validators(entry, response)
+            return [dict(item) for item in entry.get("items", [])]
+
+    def store(self, url: str, response: requests.Response, body_hash: str, items: List[Dict[str, str]]) -> None:
+        with self._lock:
+            self.stats["parsed"] += 1
+            entry: Dict[str, object] = {"body_hash": body_hash, "size": len(response.content), "items": [dict(i) for i in items]}
+            self._update_validators(entry, response)
+            self._entries[url] = entry
+            self._dirty = True
+
+    def _update_validators(self, entry: Dict[str, object], response: requests.Response) -> None:
+        for key, header in (("etag", "ETag"), ("last_modified", "Last-Modified")):
+            value = response.headers.get(header)
+            if value and entry.get(key) != value:
+                entry[key] = value
+                self._dirty = True
+
+    def log_summary(self) -> None:
+        requests_made = self.stats["requests"]
+        hits = self.stats["not_modified"] + self.stats["unchanged"]
+        hit_rate = round(hits / requests_made, 3) if requests_made else 0.0
+        logging.info(
+            "Feed cache: %d requests, %d not modified, %d unchanged body, %d parsed (hit rate %s, %d bytes saved, %d bytes downloaded)",
+            requests_made,
+            self.stats["not_modified"],
+            self.stats["unchanged"],
+            self.stats["parsed"],
+            hit_rate,
+            self.stats["bytes_saved"],
+            self.stats["bytes_downloaded"],
+        )
+
+
+Source = Tuple[str, Callable[[], List[Dict[str, str]]]]
+
+
 class FeedFetcher:
-    def __init__(self, lookback_hours: int) -> None:
+    def __init__(
+        self,
+        lookback_hours: int,
+        concurrency: int = FETCH_CONCURRENCY,
+        source_timeout: float = FETCH_SOURCE_TIMEOUT,
+        deadline: float = FETCH_DEADLINE,
+        cache: Optional[FeedCache] = None,
+    ) -> None:
         self.lookback_hours = lookback_hours
+        self.cache = cache or FeedCache()
+        self.concurrency = max(1, concurrency)
+        self.source_timeout = source_timeout
+        self.deadline = deadline
         self.session = requests.Session()
         self.session.headers.update({"User-Agent": USER_AGENT})
+        http_replay.mount(self.session, pool_size=self.concurrency)
+        metrics.instrument(self.session)
+
+    def sources(self) -> List[Source]:
+        """Return every configured source in the order results are merged."""
+        sources: List[Source] = [
+            ("GDELT", self._fetch_gdelt),
+            ("Google News", self._fetch_google_news),
+            ("Hacker News", self._fetch_hn),
+        ]
+        for name, url in CURATED_FEEDS.items():
+            sources.append((name, partial(self._fetch_rss, url, source=name)))
+        for url in _substack_feed_urls():
+            sources.append((url, partial(self._fetch_rss, url, source="Substack")))
+        return sources
 
     def fetch(self) -> List[Dict[str, str]]:
+        return self.fetch_sources(self.sources())
+
+    def fetch_sources(self, sources: List[Source]) -> List[Dict[str, str]]:
+        """Fetch ``sources`` concurrently and keep the AI-related items."""
         items: List[Dict[str, str]] = []
-        items.extend(self._fetch_gdelt())
-        items.extend(self._fetch_google_news())
-        items.extend(self._fetch_hn())
-        items.extend(self._fetch_curated_feeds())
-        items.extend(self._fetch_substack_feeds())
+        for batch in self._run_sources(sources):
+            items.extend(batch)
         logging.info("Fetched %d raw items", len(items))
         return [i for i in items if _looks_ai_related(i.get("title", ""), i.get("source", ""), i.get("url", ""))]
 
+    def _run_sources(self, sources: List[Source]) -> List[List[Dict[str, str]]]:
+        """Run sources on a bounded thread pool and return their results in input order.
+
+        A source that raises, overruns ``source_timeout`` or is still queued when the
+        overall ``deadline`` passes contributes an empty list; the others are unaffected.
+        """
+        results: List[List[Dict[str, str]]] = [[] for _ in sources]
+        if not sources:
+            return results
+        started: Dict[int, float] = {}
+
+        def run(index: int, fn: Callable[[], List[Dict[str, str]]]) -> List[Dict[str, str]]:
+            started[index] = time.monotonic()
+            with metrics.span(f"fetch.source.{sources[index][0]}"):
+                items = fn()
+            metrics.count(f"fetch.items.{sources[index][0]}", len(items))
+            return items
+
+        executor = ThreadPoolExecutor(max_workers=min(self.concurrency, len(sources)), thread_name_prefix="fetch")
+        futures: Dict[Future, int] = {executor.submit(run, idx, fn): idx for idx, (_, fn) in enumerate(sources)}
+        pending = set(futures)
+        deadline = time.monotonic() + self.deadline
+        try:
+            while pending:
+                now = time.monotonic()
+                for future in list(pending):
+                    idx = futures[future]
+                    if idx in started and not future.done() and now - started[idx] >= self.source_timeout:
+                        logging.warning("Source %s exceeded %gs; skipping", sources[idx][0], self.source_timeout)
+                        metrics.count("fetch.sources_timed_out")
+                        pending.discard(future)
+                if pending and now >= deadline:
+                    names = sorted(sources[futures[f]][0] for f in pending)
+                    logging.warning("Fetch deadline of %gs reached; dropping %s", self.deadline, ", ".join(names))
+                    metrics.count("fetch.sources_dropped", len(names))
+                    break
+                expiries = [started[futures[f]] + self.source_timeout for f in pending if futures[f] in started]
+                timeout = min([deadline, now + self.source_timeout] + expiries) - now
+                done, _ = wait(pending, timeout=max(timeout, 0.0), return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    idx = futures[future]
+                    try:
+                        results[idx] = future.result()
+                    except Exception as exc:
+                        logging.warning("Source %s failed: %s", sources[idx][0], exc)
+                        metrics.count("fetch.sources_failed")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
     def _fetch_gdelt(self) -> List[Dict[str, str]]:
         params = {
             "query": f"({KEYWORDS})",
@@ -103,7 +353,7 @@ class FeedFetcher:
             "sort": "datedesc",
         }
         url = "https://api.gdeltproject.org/api/v2/doc/doc"
-        response = self.session.get(url, params=params, timeout=30)
+        response = self.session.get(url, params=params, timeout=self.source_timeout)
         response.raise_for_status()
         try:
             data = response.json()
@@ -132,7 +382,7 @@ class FeedFetcher:
         cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(hours=self.lookback_hours)
         params = {"tags": "story", "query": KEYWORDS, "numericFilters": f"created_at_i>{int(cutoff.timestamp())}"}
         url = "https://hn.algolia.com/api/v1/search"
-        response = self.session.get(url, params=params, timeout=30)
+        response = self.session.get(url, params=params, timeout=self.source_timeout)
         response.raise_for_status()
         data = response.json()
         results = []
@@ -147,96 +397,235 @@ class FeedFetcher:
             })
         return results
 
-    def _fetch_curated_feeds(self) -> List[Dict[str, str]]:
-        feeds = {
-            "The Rundown AI": "https://www.therundown.ai/feed",
-            "Ben's Bites": "https://www.bensbites.co/feed",
-            "TLDR AI": "https://www.tldrnewsletter.com/ai/rss",
-        }
-        items: List[Dict[str, str]] = []
-        for name, url in feeds.items():
-            items.extend(self._fetch_rss(url, source=name))
-        return items
-
-    def _fetch_substack_feeds(self) -> List[Dict[str, str]]:
-        feeds_env = os.environ.get("SUBSTACK_FEEDS")
-        if not feeds_env:
-            return []
-        items: List[Dict[str, str]] = []
-        for url in feeds_env.split(","):
-            url = url.strip()
-            if not url:
-                continue
-            items.extend(self._fetch_rss(url, source="Substack"))
-        return items
-
     def _fetch_rss(self, url: str, source: str) -> List[Dict[str, str]]:
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+            response = self.session.get(url, headers=self.cache.request_headers(url), timeout=self.source_timeout)
+            if response.status_code != 304:
+                response.raise_for_status()
         except requests.RequestException as exc:
             logging.warning("Failed to fetch RSS %s (%s): %s", source, url, exc)
             return []
-        text = response.text
-        return parse_rss(text, source)
+        if response.status_code == 304:
+            cached = self.cache.not_modified(url)
+            if cached is None:
+                logging.warning("RSS %s (%s) returned 304 without a cached copy", source, url)
+                return []
+            return cached
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        cached = self.cache.unchanged(url, response, body_hash)
+        if cached is not None:
+            return cached
+        cutoff = dt.datetime.now(dt.timezone.utc) - dt.timedelta(hours=self.lookback_hours)
+        items = parse_rss(response.content, source, cutoff)
+        self.cache.store(url, response, body_hash, items)
+        return items
+
+
+def _substack_feed_urls() -> List[str]:
+    feeds_env = os.environ.get("SUBSTACK_FEEDS") or ""
+    return [url.strip() for url in feeds_env.split(",") if url.strip()]
+
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+
+
+def _feed_datetime(value: str) -> Optional[dt.datetime]:
+    if not value:
+        return None
+    try:
+        return to_utc(email.utils.parsedate_to_datetime(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return to_utc(parse_datetime(value))
+    except ValueError:
+        return None
+
+
+def _feed_entry(elem: ET.Element, source: str) -> Optional[Dict[str, str]]:
+    if elem.tag == f"{ATOM_NS}entry":
+        link_el = elem.find(f"{ATOM_NS}link")
+        title_el = elem.find(f"{ATOM_NS}title")
+        updated_el = elem.find(f"{ATOM_NS}updated")
+        if link_el is None or title_el is None:
+            return None
+        href = link_el.attrib.get("href")
+        if not href:
+            return None
+        return {
+            "url": href,
+            "title": (title_el.text or "").strip(),
+            "source": source,
+            "published": (updated_el.text if updated_el is not None else ""),
+        }
+    title = (elem.findtext("title") or "").strip()
+    link = (elem.findtext("link") or "").strip()
+    pub_date = (elem.findtext("pubDate") or elem.findtext("updated") or "").strip()
+    if not link:
+        return None
+    return {"url": link, "title": title, "source": source, "published": pub_date}
 
 
-def parse_rss(text: str, source: str) -> List[Dict[str, str]]:
-    import xml.etree.ElementTree as ET
+def iter_feed_items(stream: IO[bytes], source: str, cutoff: Optional[dt.datetime] = None) -> Iterator[Dict[str, str]]:
+    """Incrementally parse an RSS ``channel/item`` or Atom ``entry`` feed.
+
+    Entries are yielded as soon as they close and are then detached from the tree so
+    memory stays flat. Entries published before ``cutoff`` are skipped, and parsing
+    stops once ``FEED_STALE_STREAK`` stale entries arrive in a row (feeds are newest-first).
+    """
+    stack: List[ET.Element] = []
+    stale_streak = 0
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            continue
+        stack.pop()
+        is_rss_item = elem.tag == "item" and len(stack) == 2 and stack[1].tag == "channel"
+        is_atom_entry = elem.tag == f"{ATOM_NS}entry" and len(stack) == 1
+        if not (is_rss_item or is_atom_entry):
+            continue
+        entry = _feed_entry(elem, source)
+        stack[-1].remove(elem)
+        if entry is None:
+            continue
+        published = _feed_datetime(entry["published"]) if cutoff else None
+        if published is not None and published < cutoff:
+            stale_streak += 1
+            if stale_streak >= FEED_STALE_STREAK:
+                logging.debug("Stopping %s after %d stale entries", source, stale_streak)
+                return
+            continue
+        stale_streak = 0
+        yield entry
+
 
+def parse_rss(data: Union[str, bytes, IO[bytes]], source: str, cutoff: Optional[dt.datetime] = None) -> List[Dict[str, str]]:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    stream = io.BytesIO(data) if isinstance(data, bytes) else data
     items: List[Dict[str, str]] = []
     try:
-        root = ET.fromstring(text)
+        for item in iter_feed_items(stream, source, cutoff):
+            items.append(item)
     except ET.ParseError as exc:
         logging.warning("Failed to parse RSS for %s: %s", source, exc)
-        return items
-    channel = root.find("channel")
-    if channel is None:
-        # Atom feed
-        for entry in root.findall("{http://www.w3.org/2005/Atom}entry"):
-            link_el = entry.find("{http://www.w3.org/2005/Atom}link")
-            title_el = entry.find("{http://www.w3.org/2005/Atom}title")
-            updated_el = entry.find("{http://www.w3.org/2005/Atom}updated")
-            if link_el is None or title_el is None:
-                continue
-            href = link_el.attrib.get("href")
-            if not href:
-                continue
-            items.append({
-                "url": href,
-                "title": (title_el.text or "").strip(),
-                "source": source,
-                "published": (updated_el.text if updated_el is not None else ""),
-            })
-        return items
-
-    for item in channel.findall("item"):
-        title = (item.findtext("title") or "").strip()
-        link = (item.findtext("link") or "").strip()
-        pub_date = (item.findtext("pubDate") or item.findtext("updated") or "").strip()
-        if not link:
-            continue
-        items.append({"url": link, "title": title, "source": source, "published": pub_date})
     return items
 
 
 # -------- Batched enrichment --------
 
-def enrich_batch(items: List[Dict[str, str]]) -> Dict[str, Tuple[str, str, str]]:
-    """Return mapping id -> (meaning, impact, affected). Falls back to heuristics."""
-    # Heuristic fast path if no key
-    if not OPENAI_API_KEY:
-        out: Dict[str, Tuple[str, str, str]] = {}
+class EnrichmentCache:
+    """Persistent LLM enrichment results keyed by (model, prompt version, item id).
+
+    Entries older than ``max_age_days`` are dropped and the cache is trimmed to the
+    ``max_entries`` most recently used results on ``save``.
+    """
+
+    def __init__(
+        self,
+        path: pathlib.Path = ENRICH_CACHE_PATH,
+        max_entries: int = ENRICH_CACHE_MAX_ENTRIES,
+        max_age_days: float = ENRICH_CACHE_MAX_AGE_DAYS,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._entries: Dict[str, Dict[str, object]] = {}
+        self.stats = {"hits": 0, "misses": 0, "tokens_saved": 0}
+
+    @staticmethod
+    def key(item_id: str) -> str:
+        return f"{LLM_MODEL}:{ENRICH_PROMPT_VERSION}:{item_id}"
+
+    def load(self) -> None:
+        self._entries.clear()
+        if not self.path.exists():
+            return
+        try:
+            self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except ValueError as exc:
+            logging.warning("Enrichment cache %s is unreadable; starting fresh: %s", self.path, exc)
+
+    def save(self) -> None:
+        cutoff = time.time() - self.max_age_days * 86400
+        fresh = [(k, v) for k, v in self._entries.items() if float(v.get("used_at", 0)) >= cutoff]
+        fresh.sort(key=lambda kv: float(kv[1].get("used_at", 0)), reverse=True)
+        self._entries = dict(sorted(fresh[: self.max_entries]))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        temp_path.write_text(json.dumps(self._entries, ensure_ascii=False, indent=2), encoding="utf-8")
+        temp_path.replace(self.path)
+
+    def split(self, items: List[Dict[str, str]]) -> Tuple[Dict[str, Tuple[str, str, str]], List[Dict[str, str]]]:
+        """Return (cached results, items that still need enrichment)."""
+        hits: Dict[str, Tuple[str, str, str]] = {}
+        misses: List[Dict[str, str]] = []
+        now = time.time()
         for it in items:
-            t = f"{it.get('title','')} {it.get('source','')}".lower()
-            meaning, impact, affected = "AI update", "General", "Researchers"
-            if "launch" in t:
-                meaning, impact, affected = "Product launch", "Product", "Customers"
-            elif "funding" in t:
-                meaning, impact, affected = "Investment", "Finance", "Investors"
-            out[it["id"]] = (meaning, impact, affected)
-        return out
+            entry = self._entries.get(self.key(it["id"]))
+            if entry is None:
+                misses.append(it)
+                continue
+            entry["used_at"] = now
+            meaning, impact, affected = entry["value"]  # type: ignore[misc]
+            # Önceki sürümlerin önbelleğe yazdığı null/liste değerleri de düzeltilir
+            hits[it["id"]] = (
+                _enrichment_text(meaning, "AI news"),
+                _enrichment_text(impact, "General"),
+                _enrichment_text(affected, "General"),
+            )
+            self.stats["tokens_saved"] += estimate_tokens(_enrichment_payload(it)) + ENRICH_OUTPUT_TOKENS_PER_ITEM
+        self.stats["hits"] += len(hits)
+        self.stats["misses"] += len(misses)
+        return hits, misses
+
+    def store(self, results: Dict[str, Tuple[str, str, str]]) -> None:
+        now = time.time()
+        for item_id, value in results.items():
+            self._entries[self.key(item_id)] = {"value": list(value), "used_at": now}
+
+    def log_summary(self) -> None:
+        logging.info(
+            "Enrichment cache: %d hits, %d misses, ~%d tokens saved",
+            self.stats["hits"],
+            self.stats["misses"],
+            self.stats["tokens_saved"],
+        )
+
+
+def estimate_tokens(text: str) -> int:
+    # Kaba tahmin: ~4 karakter/token
+    return len(text) // 4 + 1
+
 
+def _enrichment_payload(it: Dict[str, str]) -> str:
+    return json.dumps({"id": it["id"], "title": it.get("title", ""), "source": it.get("source", "")})
+
+
+def _enrichment_text(value: object, default: str) -> str:
+    """One enrichment field as text; the model may return null, a list or a number."""
+    if isinstance(value, (list, tuple)):
+        value = ", ".join(str(v) for v in value if v is not None)
+    elif value is not None and not isinstance(value, str):
+        value = str(value)
+    return (value or "").strip() or default
+
+
+def _heuristic_enrichment(items: List[Dict[str, str]]) -> Dict[str, Tuple[str, str, str]]:
+    out: Dict[str, Tuple[str, str, str]] = {}
+    for it in items:
+        t = f"{it.get('title','')} {it.get('source','')}".lower()
+        meaning, impact, affected = "AI update", "General", "Researchers"
+        if "launch" in t:
+            meaning, impact, affected = "Product launch", "Product", "Customers"
+        elif "funding" in t:
+            meaning, impact, affected = "Investment", "Finance", "Investors"
+        out[it["id"]] = (meaning, impact, affected)
+    return out
+
+
+def _llm_enrichment(items: List[Dict[str, str]]) -> Tuple[Dict[str, Tuple[str, str, str]], int]:
+    """Single chat completion for ``items``; returns (results, total tokens) and raises on failure."""
     try:
         from openai import OpenAI  # type: ignore
     except Exception:
@@ -251,34 +640,151 @@ def enrich_batch(items: List[Dict[str, str]]) -> Dict[str, Tuple[str, str, str]]
         "items": payload,
     }
 
-    try:
-        if not OPENAI_FALLBACK:
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            resp = client.chat.completions.create(
-                model=LLM_MODEL,
-                response_format={"type": "json_object"},
-                messages=[{"role": "user", "content": json.dumps(prompt)}],
-                temperature=0,
-            )
-            content = resp.choices[0].message.content or "{}"
-        else:
-            import openai  # type: ignore
-            openai.api_key = OPENAI_API_KEY
-            resp = openai.ChatCompletion.create(
-                model=LLM_MODEL,
-                messages=[{"role": "user", "content": json.dumps(prompt)}],
-                temperature=0,
-            )
-            content = resp["choices"][0]["message"]["content"]
-        data = json.loads(content)
-        results = {it["id"]: (it.get("meaning", "AI news"), it.get("impact", "General"), it.get("affected", "General")) for it in data.get("items", [])}
-        return results
-    except Exception as exc:  # Robust fallback
-        logging.warning("OpenAI enrichment failed: %s", exc)
-        out: Dict[str, Tuple[str, str, str]] = {}
+    if not OPENAI_FALLBACK:
+        client = OpenAI(api_key=OPENAI_API_KEY, http_client=http_replay.openai_http_client())
+        resp = client.chat.completions.create(
+            model=LLM_MODEL,
+            response_format={"type": "json_object"},
+            messages=[{"role": "user", "content": json.dumps(prompt)}],
+            temperature=0,
+        )
+        content = resp.choices[0].message.content or "{}"
+        usage = getattr(getattr(resp, "usage", None), "total_tokens", 0) or 0
+    else:
+        import openai  # type: ignore
+        openai.api_key = OPENAI_API_KEY
+        resp = openai.ChatCompletion.create(
+            model=LLM_MODEL,
+            messages=[{"role": "user", "content": json.dumps(prompt)}],
+            temperature=0,
+        )
+        content = resp["choices"][0]["message"]["content"]
+        usage = (resp.get("usage") or {}).get("total_tokens", 0)
+    data = json.loads(content)
+    results = {
+        it["id"]: (
+            _enrichment_text(it.get("meaning"), "AI news"),
+            _enrichment_text(it.get("impact"), "General"),
+            _enrichment_text(it.get("affected"), "General"),
+        )
+        for it in data.get("items", [])
+    }
+    return results, int(usage)
+
+
+class EnrichmentExecutor:
+    """Runs LLM enrichment in token-budgeted chunks with bounded concurrency.
+
+    Failed chunks, and items a response left out, are retried with exponential
+    backoff; whatever still fails after ``retries`` is returned in ``failed``.
+    ``chunk_stats`` records items, estimated/actual tokens, latency and attempts per chunk.
+    """
+
+    def __init__(
+        self,
+        chunk_tokens: int = ENRICH_CHUNK_TOKENS,
+        max_in_flight: int = ENRICH_MAX_IN_FLIGHT,
+        retries: int = ENRICH_RETRIES,
+        backoff: float = ENRICH_BACKOFF_SECONDS,
+    ) -> None:
+        self.chunk_tokens = chunk_tokens
+        self.max_in_flight = max(1, max_in_flight)
+        self.retries = retries
+        self.backoff = backoff
+        self.chunk_stats: List[Dict[str, object]] = []
+        self.failed: List[Dict[str, str]] = []
+
+    def chunks(self, items: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+        chunks: List[List[Dict[str, str]]] = []
+        current: List[Dict[str, str]] = []
+        budget = ENRICH_PROMPT_OVERHEAD_TOKENS
         for it in items:
-            out[it["id"]] = ("AI news", "General", "General")
+            cost = estimate_tokens(_enrichment_payload(it)) + ENRICH_OUTPUT_TOKENS_PER_ITEM
+            if current and budget + cost > self.chunk_tokens:
+                chunks.append(current)
+                current, budget = [], ENRICH_PROMPT_OVERHEAD_TOKENS
+            current.append(it)
+            budget += cost
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def run(self, items: List[Dict[str, str]]) -> Dict[str, Tuple[str, str, str]]:
+        self.chunk_stats = []
+        self.failed = []
+        results: Dict[str, Tuple[str, str, str]] = {}
+        chunks = self.chunks(items)
+        if not chunks:
+            return results
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(chunks)), thread_name_prefix="enrich") as executor:
+            for chunk_results, leftovers in executor.map(self._run_chunk, range(len(chunks)), chunks):
+                results.update(chunk_results)
+                self.failed.extend(leftovers)
+        return results
+
+    def _run_chunk(self, index: int, chunk: List[Dict[str, str]]) -> Tuple[Dict[str, Tuple[str, str, str]], List[Dict[str, str]]]:
+        results: Dict[str, Tuple[str, str, str]] = {}
+        pending = chunk
+        stats: Dict[str, object] = {
+            "chunk": index,
+            "items": len(chunk),
+            "estimated_tokens": ENRICH_PROMPT_OVERHEAD_TOKENS + sum(estimate_tokens(_enrichment_payload(it)) for it in chunk),
+            "tokens": 0,
+            "attempts": 0,
+            "latency_s": 0.0,
+        }
+        for attempt in range(self.retries + 1):
+            if attempt:
+                metrics.count("enrich.retries")
+                time.sleep(self.backoff * (2 ** (attempt - 1)))
+            stats["attempts"] = attempt + 1
+            started = time.monotonic()
+            try:
+                chunk_results, tokens = _llm_enrichment(pending)
+            except Exception as exc:
+                logging.warning("Enrichment chunk %d attempt %d failed: %s", index, attempt + 1, exc)
+                metrics.count("enrich.errors")
+                continue
+            finally:
+                elapsed = time.monotonic() - started
+                stats["latency_s"] = round(float(stats["latency_s"]) + elapsed, 3)
+                metrics.record_span("enrich.llm_call", elapsed)
+            stats["tokens"] = int(stats["tokens"]) + tokens
+            metrics.count("enrich.tokens", tokens)
+            wanted = {it["id"] for it in pending}
+            results.update({k: v for k, v in chunk_results.items() if k in wanted})
+            pending = [it for it in pending if it["id"] not in results]
+            if not pending:
+                break
+        stats["failed"] = len(pending)
+        self.chunk_stats.append(stats)
+        return results, pending
+
+
+def enrich_batch(items: List[Dict[str, str]], cache: Optional[EnrichmentCache] = None) -> Dict[str, Tuple[str, str, str]]:
+    """Return mapping id -> (meaning, impact, affected). Falls back to heuristics."""
+    # Heuristic fast path if no key
+    if not OPENAI_API_KEY:
+        return _heuristic_enrichment(items)
+
+    out: Dict[str, Tuple[str, str, str]] = {}
+    misses = items
+    if cache is not None:
+        out, misses = cache.split(items)
+    if not misses:
         return out
+    executor = EnrichmentExecutor()
+    results = executor.run(misses)
+    for stats in sorted(executor.chunk_stats, key=lambda x: int(x["chunk"])):
+        logging.info("Enrichment chunk %s", json.dumps(stats))
+    if cache is not None:
+        cache.store(results)
+    out.update(results)
+    if executor.failed:
+        # Robust fallback: yalnızca gerçekten başarısız olan kalemler sezgisel yoldan doldurulur
+        logging.warning("OpenAI enrichment failed for %d items; using heuristics", len(executor.failed))
+        out.update(_heuristic_enrichment(executor.failed))
+    return out
 
 
 def build_slack_blocks(item: NewsItem) -> List[Dict]:
@@ -289,27 +795,40 @@ def build_slack_blocks(item: NewsItem) -> List[Dict]:
     ]
 
 
-def dedupe_items(raw_items: Iterable[Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+def dedupe_items(raw_items: Iterable[Dict[str, str]], similarity: float = DEDUPE_SIMILARITY) -> Dict[str, Dict[str, str]]:
+    """Group items by normalized URL, exact title or near-duplicate title.
+
+    Near-duplicates are found with a MinHash/LSH index over title shingles; a
+    ``similarity`` of 1.0 or more disables fuzzy matching.
+    """
     deduped: Dict[str, Dict[str, str]] = {}
     groups: Dict[str, List[str]] = {}
     title_index: Dict[str, str] = {}
+    lsh = MinHashLSH(threshold=similarity) if similarity < 1.0 else None
     for item in raw_items:
         url = item.get("url")
         if not url:
             continue
         normalized = normalize_url(url)
         item["normalized_url"] = normalized
-        title_key = re.sub(r"\W+", "", (item.get("title") or "").lower())
+        title = item.get("title") or ""
+        title_key = re.sub(r"\W+", "", title.lower())
+        tokens = title_tokens(title) if lsh else frozenset()
+        signature = lsh.signature(tokens) if lsh and len(tokens) >= MIN_TOKENS else None
         existing_key = None
         if normalized in deduped:
             existing_key = normalized
         elif title_key and title_key in title_index:
             existing_key = title_index[title_key]
+        elif lsh:
+            existing_key = lsh.query(tokens, signature)
         if existing_key is None:
             deduped[normalized] = item
             groups[normalized] = [item.get("source", "")]  # type: ignore[index]
             if title_key:
                 title_index[title_key] = normalized
+            if lsh:
+                lsh.insert(normalized, tokens, signature)
         else:
             groups.setdefault(existing_key, []).append(item.get("source", ""))
     for normalized, item in deduped.items():
@@ -317,44 +836,45 @@ def dedupe_items(raw_items: Iterable[Dict[str, str]]) -> Dict[str, Dict[str, str
     return deduped
 
 
-def select_new_items(state: StateStore, candidates: List[NewsItem]) -> List[NewsItem]:
-    fresh: List[NewsItem] = []
-    for item in candidates:
-        if state.get(item.id) is not None:
-            continue
-        fresh.append(item)
-    fresh.sort(key=lambda x: x.accuracy, reverse=True)
-    return fresh[:MAX_ITEMS]
-
+def reconcile_postings(journal: PostingJournal, store: StateStore, seen: SeenIds, slack: SlackClient) -> int:
+    """Fold posts left in the journal by an interrupted run back into state.
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("--dry-run", action="store_true", help="Do not post to Slack")
-    args = parser.parse_args()
-
-    configure_logging()
-    lookback_hours = DEFAULT_LOOKBACK_HOURS
-
-    store = StateStore()
-    store.load()
-
-    fetcher = FeedFetcher(lookback_hours=lookback_hours)
-    raw_items = fetcher.fetch()
-    deduped = dedupe_items(raw_items)
-    weights = load_domain_weights()
-
-    now = dt.datetime.now(dt.timezone.utc)
+    Posts with a recorded outcome are restored as-is; for bare intents Slack history is
+    searched, and intents with no matching message are dropped so the item can be
+    selected again. Returns the number of recovered items.
+    """
+    entries = journal.entries()
+    if not entries:
+        return 0
+    recovered = 0
+    for entry in entries:
+        item = NewsItem.from_json(dict(entry["item"]))  # type: ignore[arg-type]
+        ts = entry["ts"] if entry["posted"] else slack.find_message(str(entry["channel"]), item, float(entry["at"]) - 1)
+        if not entry["posted"] and not ts:
+            logging.info("Posting of %s was never confirmed; it may be selected again", item.id)
+            continue
+        if ts:
+            item.set_slack_ts("daily", str(ts))
+        store.upsert(item)
+        seen.add(item.id)
+        recovered += 1
+    store.save()
+    seen.save()
+    journal.clear()
+    logging.info("Recovered %d posts from an interrupted run", recovered)
+    return recovered
 
-    # Hazırlık: batch enrichment girişleri
-    batch_input: List[Dict[str, str]] = []
-    pre_candidates: List[Dict[str, object]] = []
 
-    for normalized, item in deduped.items():
-        published_raw = item.get("published") or now.isoformat()
+def parse_published(published_raw: Optional[str], now: dt.datetime) -> dt.datetime:
+    """Parse a feed ``published`` value into an aware UTC datetime."""
+    published_raw = published_raw or now.isoformat()
+    # ISO tarihler (HN, Atom, GDELT) strptime denemelerine girmeden çözülür
+    try:
+        parsed: Optional[dt.datetime] = dt.datetime.fromisoformat(published_raw.replace("Z", "+00:00"))
+    except ValueError:
         parsed = None
+    if parsed is None:
         for fmt in (
-            "%Y-%m-%dT%H:%M:%S%z",
-            "%Y-%m-%dT%H:%M:%S.%f%z",
             "%Y-%m-%d %H:%M:%S",
             "%Y%m%d%H%M%S",
             "%a, %d %b %Y %H:%M:%S %Z",
@@ -365,71 +885,154 @@ def main() -> None:
                 break
             except ValueError:
                 continue
-        if parsed is None:
-            try:
-                parsed = dt.datetime.fromisoformat(published_raw.replace("Z", "+00:00"))
-            except ValueError:
-                # Tarihi yoksa en taze sayma: 24 saat eski kabul et
-                parsed = now - dt.timedelta(hours=24)
-        if parsed.tzinfo is None:
-            parsed = parsed.replace(tzinfo=dt.timezone.utc)
-        published_utc = parsed.astimezone(dt.timezone.utc)
-        recency = compute_recency_score(published_utc, now=now, lookback_hours=lookback_hours)
-        domain_weight = domain_weight_for(item["url"], weights)
-        corroborations = item.get("corroborations", 0)
-        accuracy = compute_accuracy(domain_weight, corroborations, recency)
-        item_id = make_item_id(item["url"])
-        pre_candidates.append({
-            "id": item_id,
-            "url": item["url"],
-            "title": item.get("title") or "(untitled)",
-            "source": item.get("source") or "unknown",
-            "published_utc": published_utc.isoformat(),
-            "accuracy": accuracy,
-            "corroborations": corroborations,
-        })
-        batch_input.append({"id": item_id, "title": item.get("title") or "", "source": item.get("source") or ""})
-
-    enrich_map = enrich_batch(batch_input)
+    if parsed is None:
+        # Tarihi yoksa en taze sayma: 24 saat eski kabul et
+        parsed = now - dt.timedelta(hours=24)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=dt.timezone.utc)
+    return parsed.astimezone(dt.timezone.utc)
+
 
+def build_candidates(deduped: Dict[str, Dict[str, str]], weights: Dict[str, float], now: dt.datetime, lookback_hours: int) -> List[NewsItem]:
+    """Score deduplicated feed items into ``daily`` NewsItem candidates (as one batch)."""
+    entries = list(deduped.values())
+    published = [parse_published(item.get("published"), now) for item in entries]
+    epochs = [value.timestamp() for value in published]
+    hosts = [urlparse(item["url"]).netloc.lower() for item in entries]
+    corroborations = [int(item.get("corroborations", 0)) for item in entries]
+    _, _, accuracy = candidate_scores(epochs, hosts, corroborations, weights, now.timestamp(), lookback_hours)
     candidates: List[NewsItem] = []
-    for raw in pre_candidates:
-        meaning, impact, affected = enrich_map.get(raw["id"], ("AI news", "General", "General"))
-        candidate = NewsItem(
-            id=raw["id"],
-            url=raw["url"],
-            title=raw["title"],
-            source=raw["source"],
-            published_utc=raw["published_utc"],
+    for item, published_utc, epoch, corr, acc in zip(entries, published, epochs, corroborations, accuracy):
+        candidates.append(NewsItem(
+            id=make_item_id(item["url"]),
+            url=item["url"],
+            title=item.get("title") or "(untitled)",
+            source=item.get("source") or "unknown",
+            published_utc=published_utc.isoformat(),
+            published_epoch=epoch,
             status="daily",
-            accuracy=float(raw["accuracy"]),
-            corroborations=int(raw["corroborations"]),
-            meaning=meaning,
-            impact=impact,
-            affected=affected,
-        )
-        candidates.append(candidate)
+            accuracy=float(acc),
+            corroborations=corr,
+            meaning="AI news",
+            impact="General",
+            affected="General",
+        ))
+    return candidates
+
 
-    fresh_items = select_new_items(store, candidates)
+def select_new_items(state: StateStore, candidates: List[NewsItem]) -> List[NewsItem]:
+    fresh: List[NewsItem] = []
+    for item in candidates:
+        if state.get(item.id) is not None:
+            continue
+        fresh.append(item)
+    fresh.sort(key=lambda x: x.accuracy, reverse=True)
+    return fresh[:MAX_ITEMS]
+
+
+def post_new_items(
+    raw_items: List[Dict[str, str]],
+    store: StateStore,
+    seen: SeenIds,
+    slack: SlackClient,
+    journal: PostingJournal,
+    weights: Dict[str, float],
+    lookback_hours: int,
+    enrich_cache: Optional[EnrichmentCache] = None,
+) -> List[NewsItem]:
+    """Dedupe, score, select, enrich and post fetched items; returns the posted items.
+
+    Posted items are upserted into ``store`` and added to ``seen``; persisting both is
+    left to the caller.
+    """
+    with metrics.span("dedupe"):
+        deduped = dedupe_items(raw_items)
+        unseen = {key: item for key, item in deduped.items() if make_item_id(item["url"]) not in seen}
+    if len(unseen) < len(deduped):
+        logging.info("Skipped %d previously handled items", len(deduped) - len(unseen))
+    metrics.count("items.deduped", len(deduped))
+    metrics.count("items.unseen", len(unseen))
+    deduped = unseen
+
+    with metrics.span("score"):
+        now = dt.datetime.now(dt.timezone.utc)
+        candidates = build_candidates(deduped, weights, now, lookback_hours)
+        fresh_items = select_new_items(store, candidates)
     logging.info("Identified %d fresh items", len(fresh_items))
+    metrics.count("items.candidates", len(candidates))
+    metrics.count("items.selected", len(fresh_items))
+
+    # Yalnızca state filtresinden ve top-K seçiminden geçenler zenginleştirilir
+    with metrics.span("enrich"):
+        batch_input = [{"id": item.id, "title": item.title, "source": item.source} for item in fresh_items]
+        enrich_map = enrich_batch(batch_input, cache=enrich_cache)
+        for item in fresh_items:
+            item.set_enrichment(*enrich_map.get(item.id, ("AI news", "General", "General")))
 
-    slack = SlackClient(token=None if args.dry_run else SLACK_BOT_TOKEN)
     posted_count = 0
 
-    for item in fresh_items:
-        blocks = build_slack_blocks(item)
-        ts = slack.post_message(SLACK_CH_DAILY, item.title, blocks=blocks)
-        if ts:
-            item.ts_daily = ts
-        store.upsert(item)
-        posted_count += 1
+    with metrics.span("post"):
+        for item in fresh_items:
+            blocks = build_slack_blocks(item)
+            journal.record_intent(item, SLACK_CH_DAILY)
+            ts = slack.post_message(SLACK_CH_DAILY, item.title, blocks=blocks, item_id=item.id)
+            journal.record_posted(item.id, ts)
+            if ts:
+                item.set_slack_ts("daily", ts)
+            store.upsert(item)
+            seen.add(item.id)
+            posted_count += 1
+    metrics.count("items.posted", posted_count)
 
     if not fresh_items:
         logging.info("No new items to post")
     else:
         logging.info("Posted %d new items", posted_count)
+    return fresh_items
 
-    store.save()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true", help="Do not post to Slack")
+    args = parser.parse_args()
+
+    configure_logging()
+    lookback_hours = DEFAULT_LOOKBACK_HOURS
+
+    with metrics.span("load_state"):
+        store = open_state_store()
+        store.load()
+        seen = SeenIds()
+        seen.load()
+    slack = SlackClient(token=None if args.dry_run else SLACK_BOT_TOKEN)
+    journal = PostingJournal()
+    with metrics.span("reconcile"):
+        metrics.count("items.recovered", reconcile_postings(journal, store, seen, slack))
+
+    with metrics.span("fetch"):
+        feed_cache = FeedCache()
+        feed_cache.load()
+        fetcher = FeedFetcher(lookback_hours=lookback_hours, cache=feed_cache)
+        raw_items = fetcher.fetch()
+        feed_cache.log_summary()
+        feed_cache.save()
+    metrics.merge("feed_cache", feed_cache.stats)
+    metrics.count("items.fetched", len(raw_items))
+
+    enrich_cache = EnrichmentCache()
+    enrich_cache.load()
+    fresh_items = post_new_items(raw_items, store, seen, slack, journal, load_domain_weights(), lookback_hours, enrich_cache)
+    if OPENAI_API_KEY:
+        enrich_cache.log_summary()
+        enrich_cache.save()
+        metrics.merge("enrich_cache", enrich_cache.stats)
+    if slack.token:
+        slack.transport.log_summary()
+
+    with metrics.span("save_state"):
+        store.save()
+        seen.save()
+        journal.clear()
 
     preview_path = os.environ.get("PREVIEW_JSON")
     if preview_path:
@@ -438,4 +1041,5 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
+    with metrics.run("fetch_and_post_daily"):
+        main()
@@ -3,21 +3,34 @@ from __future__ import annotations
 
 import argparse
 import datetime as dt
+import hashlib
 import json
 import logging
 import os
 import pathlib
-from typing import Dict, Iterable, List, Optional
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set
 
 import requests
 
-from common import NewsItem, StateStore, configure_logging, group_by_status, write_file
+import http_replay
+from common import STATE_PATH, NewsItem, StateStore, configure_logging, ensure_dir, open_state_store, published_sort_key, write_file
+from run_metrics import metrics
 
 GITHUB_API = "https://api.github.com"
 DEFAULT_BRANCH = os.environ.get("DEFAULT_BRANCH", os.environ.get("GITHUB_BASE_BRANCH", "main"))
 PR_BRANCH_PREFIX = os.environ.get("PR_BRANCH_PREFIX", "auto/ai-news/")
 NEWS_DIR = pathlib.Path("news")
 INDEX_PATH = NEWS_DIR / "index.md"
+STATUSES = ("daily", "weekly", "monthly", "archived")
+ARCHIVE_INDEX_PATH = NEWS_DIR / "archived" / "index.md"
+ARCHIVE_SHARD_DIR = NEWS_DIR / "archived" / "months"
+ARCHIVE_PAGE_SIZE = int(os.environ.get("ARCHIVE_PAGE_SIZE", "100"))
+GITHUB_UPLOAD_WORKERS = int(os.environ.get("GITHUB_UPLOAD_WORKERS", "4"))
+# Dizin listeleri tree SHA'sına göre önbelleklenir; state/ dışında ve git'e girmeden tutulur
+BASE_TREE_CACHE_PATH = pathlib.Path(os.environ.get("BASE_TREE_CACHE_PATH", ".github-tree-cache.json"))
+MARKDOWN_MANIFEST_PATH = pathlib.Path(os.environ.get("MARKDOWN_MANIFEST_PATH", str(STATE_PATH.parent / "markdown_manifest.json")))
 
 
 def build_markdown(item: NewsItem) -> str:
@@ -46,11 +59,52 @@ def build_markdown(item: NewsItem) -> str:
     return "\n".join(header_lines) + body
 
 
-def render_index(groups: Dict[str, List[NewsItem]]) -> str:
-    now = dt.datetime.now(dt.timezone.utc)
-    lines = ["# AI News Digest", "", f"_Updated {now.isoformat()}_", ""]
-    order = ["daily", "weekly", "monthly", "archived"]
-    titles = {"daily": "Daily Highlights", "weekly": "Weekly Spotlight", "monthly": "Monthly Archive", "archived": "Archived"}
+def archive_month(item: NewsItem) -> str:
+    month = item.published_utc[:7]
+    return month if re.fullmatch(r"\d{4}-\d{2}", month) else "undated"
+
+
+def archive_pages(month: str, items: List[NewsItem]) -> Dict[str, str]:
+    """Render one month of archived items as pages of ``ARCHIVE_PAGE_SIZE`` entries."""
+    chunks = [items[i : i + ARCHIVE_PAGE_SIZE] for i in range(0, len(items), ARCHIVE_PAGE_SIZE)]
+    names = [f"{month}.md"] + [f"{month}-p{n}.md" for n in range(2, len(chunks) + 1)]
+    pages: Dict[str, str] = {}
+    for number, (name, chunk) in enumerate(zip(names, chunks), start=1):
+        lines = [f"# Archived AI News — {month}", ""]
+        if len(chunks) > 1:
+            lines += [f"_Page {number} of {len(chunks)}_", ""]
+        for item in chunk:
+            lines.append(f"- [{item.title}](../{item.id}.md) — {item.source} (accuracy {item.accuracy})")
+        nav = ["[Archive index](../index.md)"]
+        if number > 1:
+            nav.insert(0, f"[Previous](./{names[number - 2]})")
+        if number < len(chunks):
+            nav.append(f"[Next](./{names[number]})")
+        lines += ["", " | ".join(nav)]
+        pages[str(ARCHIVE_SHARD_DIR / name)] = "\n".join(lines) + "\n"
+    return pages
+
+
+def render_archive_index(months: Dict[str, List[str]], counts: Dict[str, int]) -> str:
+    lines = ["# AI News Archive", ""]
+    for month in sorted(months, reverse=True):
+        pages = sorted(months[month], key=lambda p: (len(p), p))
+        links = ", ".join(f"[{n}](./months/{pathlib.Path(p).name})" for n, p in enumerate(pages, start=1))
+        label = f"[{month}](./months/{pathlib.Path(pages[0]).name})"
+        lines.append(f"- {label} — {counts[month]} stories" + (f" (pages {links})" if len(pages) > 1 else ""))
+    return "\n".join(lines).strip() + "\n"
+
+
+def render_index(groups: Dict[str, List[NewsItem]], updated: Optional[str] = None, archived_count: Optional[int] = None) -> str:
+    """Top-level index: active items in full, archived items only as a link to the archive shards.
+
+    ``archived_count`` replaces ``len(groups["archived"])`` when the archived items are not loaded.
+    """
+    if updated is None:
+        updated = dt.datetime.now(dt.timezone.utc).isoformat()
+    lines = ["# AI News Digest", "", f"_Updated {updated}_", ""]
+    order = ["daily", "weekly", "monthly"]
+    titles = {"daily": "Daily Highlights", "weekly": "Weekly Spotlight", "monthly": "Monthly Archive"}
     for status in order:
         lines.append(f"## {titles[status]}")
         lines.append("")
@@ -58,60 +112,210 @@ def render_index(groups: Dict[str, List[NewsItem]]) -> str:
             link = f"[{item.title}](./{status}/{item.id}.md)"
             lines.append(f"- {link} — {item.source} (accuracy {item.accuracy})")
         lines.append("")
+    lines.append("## Archived")
+    lines.append("")
+    if archived_count is None:
+        archived_count = len(groups.get("archived", []))
+    lines.append(f"- [Browse the archive](./archived/index.md) — {archived_count} stories")
     return "\n".join(lines).strip() + "\n"
 
 
+class MarkdownManifest:
+    """Content hashes of the Markdown mirror: items, index, archive index and archive shards."""
+
+    def __init__(self, path: pathlib.Path = MARKDOWN_MANIFEST_PATH) -> None:
+        self.path = path
+        self.items: Dict[str, Dict[str, str]] = {}
+        self.index_hash = ""
+        self.archive_index_hash = ""
+        self.shards: Dict[str, Dict[str, str]] = {}
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        self.items = data.get("items", {})
+        self.index_hash = data.get("index_hash", "")
+        self.archive_index_hash = data.get("archive_index_hash", "")
+        self.shards = data.get("shards", {})
+
+    def save(self) -> None:
+        data = {"index_hash": self.index_hash, "archive_index_hash": self.archive_index_hash, "shards": self.shards, "items": self.items}
+        write_file(self.path, json.dumps(data, indent=1, sort_keys=True) + "\n")
+
+
+def git_blob_sha(content: str) -> str:
+    """SHA-1 git assigns to a blob with ``content`` (UTF-8)."""
+    data = content.encode("utf-8")
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
 class GitHubAgent:
     def __init__(self, token: Optional[str], repo: Optional[str]) -> None:
         self.token = token
         self.repo = repo
-        self.session = requests.Session()
+        self.session = http_replay.mount(requests.Session(), pool_size=GITHUB_UPLOAD_WORKERS)
         self.session.headers.update({"User-Agent": "ai-news-pipeline/1.0"})
         if token:
             self.session.headers.update({"Authorization": f"Bearer {token}"})
+        metrics.instrument(self.session)
 
     # Local sync helpers -------------------------------------------------
-    def sync_to_filesystem(self, items: Iterable[NewsItem]) -> None:
-        groups = group_by_status(items)
-        for status, bucket in groups.items():
-            folder = NEWS_DIR / status
-            folder.mkdir(parents=True, exist_ok=True)
-            existing_files = {p.name for p in folder.glob("*.md")}
-            target_files = set()
-            for item in bucket:
-                path = folder / f"{item.id}.md"
-                write_file(path, build_markdown(item))
-                target_files.add(path.name)
-            for filename in existing_files - target_files:
-                (folder / filename).unlink()
-        index_content = render_index(groups)
-        write_file(INDEX_PATH, index_content)
-
-    def sync(self, items: Iterable[NewsItem]) -> None:
-        groups = group_by_status(items)
-        files: Dict[str, str] = {}
-        for status, bucket in groups.items():
-            for item in bucket:
-                path = f"news/{status}/{item.id}.md"
-                files[path] = build_markdown(item)
-        files[str(INDEX_PATH)] = render_index(groups)
-        changed = False
-        for path, content in files.items():
-            local_path = pathlib.Path(path)
-            if not local_path.exists() or local_path.read_text(encoding="utf-8") != content:
-                changed = True
-                break
-        self.sync_to_filesystem(items)
+    def sync_to_filesystem(self, store: StateStore, dirty_ids: Optional[Set[str]] = None, full: bool = False) -> Dict[str, Optional[str]]:
+        """Bring ``news/`` in line with ``store`` and return the touched paths.
+
+        The manifest remembers each item's file path, content hash and archive month. With
+        ``dirty_ids`` only those items and the ids added to or removed from the store since
+        the manifest was written are read and re-rendered; without it every item is checked.
+        Unchanged files are not rewritten and status changes move files with a rename. The
+        index is built from ``by_status`` of the active statuses, and only the archive
+        months whose entries changed are read and regenerated. The result maps each written
+        path to its content and each deleted path to ``None``. ``full`` ignores the manifest.
+        """
+        manifest = MarkdownManifest()
+        if not full:
+            manifest.load()
+        # Arşiv parçalarından önceki manifestlerde shard bilgisi yok; bir kez tam senkron gerekir
+        if not manifest.items or not manifest.archive_index_hash:
+            full = True
+        touched: Dict[str, Optional[str]] = {}
+        current: Dict[str, Dict[str, str]] = {}
+        if full or dirty_ids is None:
+            checked = list(store.values())
+        else:
+            # Başka bir sürecin eklediği/sildiği kalemler manifestle id farkından bulunur
+            check_ids = set(dirty_ids) | (store.ids() ^ manifest.items.keys())
+            current = {item_id: entry for item_id, entry in manifest.items.items() if item_id not in check_ids}
+            checked = [item for item in map(store.get, sorted(check_ids)) if item is not None]
+        rendered: Set[str] = set()
+        for item in checked:
+            path = NEWS_DIR / item.status / f"{item.id}.md"
+            key = str(path)
+            entry = manifest.items.get(item.id)
+            content = build_markdown(item)
+            digest = _content_hash(content)
+            current[item.id] = {"path": key, "hash": digest}
+            if item.status == "archived":
+                current[item.id]["shard"] = archive_month(item)
+            rendered.add(item.id)
+            if entry and entry["path"] != key and pathlib.Path(entry["path"]).exists():
+                # Status değişti: dosya yeni klasöre taşınır (git rename olarak görünür)
+                ensure_dir(path)
+                pathlib.Path(entry["path"]).replace(path)
+                touched[entry["path"]] = None
+            elif entry and entry["hash"] == digest and path.exists():
+                continue
+            elif not entry and path.exists() and _content_hash(path.read_text(encoding="utf-8")) == digest:
+                continue
+            write_file(path, content)
+            touched[key] = content
+        live_paths = {entry["path"] for entry in current.values()}
+        for item_id, entry in manifest.items.items():
+            if item_id not in current and entry["path"] not in live_paths and pathlib.Path(entry["path"]).exists():
+                pathlib.Path(entry["path"]).unlink()
+                touched[entry["path"]] = None
+        if full:
+            for status in STATUSES:
+                for path in (NEWS_DIR / status).glob("*.md"):
+                    if str(path) not in live_paths and path.name not in ("README.md", "index.md"):
+                        path.unlink()
+                        touched[str(path)] = None
+        groups = {status: store.by_status(status) for status in STATUSES if status != "archived"}
+        archived_count = sum(1 for entry in current.values() if entry.get("shard"))
+        index_hash = _content_hash(render_index(groups, updated="", archived_count=archived_count))
+        if full or index_hash != manifest.index_hash or not INDEX_PATH.exists():
+            index_content = render_index(groups, archived_count=archived_count)
+            write_file(INDEX_PATH, index_content)
+            touched[str(INDEX_PATH)] = index_content
+        manifest.index_hash = index_hash
+        # Yalnızca üyeliği değişen arşiv ayları yeniden üretilir
+        affected: Set[str] = set()
+        for item_id in rendered | (manifest.items.keys() - current.keys()):
+            for entry in (manifest.items.get(item_id), current.get(item_id)):
+                if entry and entry.get("shard"):
+                    affected.add(entry["shard"])
+        self._sync_archive(store, current, affected, manifest, touched, full)
+        manifest.items = current
+        manifest.save()
+        logging.info("Markdown sync touched %d files (%d items)", len(touched), len(current))
+        metrics.count("github.items_rendered", len(rendered))
+        metrics.count("github.files_touched", len(touched))
+        return touched
+
+    def _sync_archive(
+        self,
+        store: StateStore,
+        current: Dict[str, Dict[str, str]],
+        affected: Set[str],
+        manifest: MarkdownManifest,
+        touched: Dict[str, Optional[str]],
+        full: bool,
+    ) -> None:
+        counts: Dict[str, int] = {}
+        for entry in current.values():
+            if entry.get("shard"):
+                counts[entry["shard"]] = counts.get(entry["shard"], 0) + 1
+        if full:
+            affected = set(counts) | set(manifest.shards)
+        # Yalnızca yeniden üretilecek ayların kalemleri okunur
+        by_month: Dict[str, List[NewsItem]] = {}
+        for item_id, entry in current.items():
+            if entry.get("shard") in affected:
+                item = store.get(item_id)
+                if item is not None:
+                    by_month.setdefault(entry["shard"], []).append(item)
+        for items in by_month.values():
+            items.sort(key=lambda item: (published_sort_key(item), item.id), reverse=True)
+        for month in sorted(affected):
+            pages = archive_pages(month, by_month.get(month, []))
+            old_pages = manifest.shards.get(month, {})
+            new_pages: Dict[str, str] = {}
+            for path, content in pages.items():
+                digest = _content_hash(content)
+                new_pages[path] = digest
+                if full or old_pages.get(path) != digest or not pathlib.Path(path).exists():
+                    write_file(pathlib.Path(path), content)
+                    touched[path] = content
+            for path in old_pages.keys() - new_pages.keys():
+                if pathlib.Path(path).exists():
+                    pathlib.Path(path).unlink()
+                touched[path] = None
+            if new_pages:
+                manifest.shards[month] = new_pages
+            else:
+                manifest.shards.pop(month, None)
+        if full and ARCHIVE_SHARD_DIR.exists():
+            live = {path for pages in manifest.shards.values() for path in pages}
+            for path in ARCHIVE_SHARD_DIR.glob("*.md"):
+                if str(path) not in live:
+                    path.unlink()
+                    touched[str(path)] = None
+        months = {month: list(pages) for month, pages in manifest.shards.items()}
+        archive_index = render_archive_index(months, counts)
+        digest = _content_hash(archive_index)
+        if full or digest != manifest.archive_index_hash or not ARCHIVE_INDEX_PATH.exists():
+            write_file(ARCHIVE_INDEX_PATH, archive_index)
+            touched[str(ARCHIVE_INDEX_PATH)] = archive_index
+        manifest.archive_index_hash = digest
+
+    def sync(self, store: StateStore, dirty_ids: Optional[Set[str]] = None, full: bool = False) -> None:
+        with metrics.span("github.markdown_sync"):
+            files = self.sync_to_filesystem(store, dirty_ids=dirty_ids, full=full)
         if not self.token:
             logging.info("GitHub token not provided; skipping PR")
             return
-        if not changed:
+        if not files:
             logging.info("No content changes detected; skipping PR")
             return
         branch_suffix = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%d%H%M%S")
         title = "[codex] Sync AI news"
         body = "Automated sync of AI news content."
-        self.open_pr(branch_suffix, title, body, files)
+        with metrics.span("github.open_pr"):
+            self.open_pr(branch_suffix, title, body, files)
 
     # GitHub API helpers -------------------------------------------------
     def _ensure_repo(self) -> None:
@@ -129,7 +333,73 @@ class GitHubAgent:
             return response.json()
         return None
 
-    def open_pr(self, branch_suffix: str, title: str, body: str, files: Dict[str, str]) -> None:
+    def _base_tree_blobs(self, tree_sha: str) -> Optional[Dict[str, str]]:
+        """Return path -> blob SHA for the files under ``NEWS_DIR`` in ``tree_sha``.
+
+        The base tree changes every run (state is committed each cycle), but most
+        directories below ``news/`` do not. Each directory listing is cached on disk by
+        its own tree SHA, so only directories that changed since the last run are
+        fetched, one non-recursive request each.
+        """
+        cached: Dict[str, Dict[str, List[str]]] = {}
+        if BASE_TREE_CACHE_PATH.exists():
+            try:
+                cached = json.loads(BASE_TREE_CACHE_PATH.read_text(encoding="utf-8")).get("trees", {})
+            except ValueError:
+                logging.warning("Tree cache %s is unreadable; fetching every directory", BASE_TREE_CACHE_PATH)
+        used: Dict[str, Dict[str, List[str]]] = {}
+        fetched = 0
+
+        def listing(sha: str) -> Optional[Dict[str, List[str]]]:
+            nonlocal fetched
+            entries = cached.get(sha)
+            if entries is None:
+                tree = self._request("GET", f"/repos/{self.repo}/git/trees/{sha}")
+                if tree.get("truncated"):
+                    return None
+                entries = {entry["path"]: [entry["type"], entry["sha"]] for entry in tree.get("tree", [])}
+                fetched += 1
+            used[sha] = entries
+            return entries
+
+        # Kök ağaçtan news/ alt ağacına inilir
+        sha: Optional[str] = tree_sha
+        for part in NEWS_DIR.parts:
+            entries = listing(sha) if sha else None
+            if entries is None and sha:
+                logging.warning("Base tree %s is truncated; uploading every file", tree_sha)
+                return None
+            entry = (entries or {}).get(part)
+            sha = entry[1] if entry and entry[0] == "tree" else None
+        blobs: Dict[str, str] = {}
+        pending = [(NEWS_DIR.as_posix(), sha)] if sha else []
+        while pending:
+            prefix, sha = pending.pop()
+            entries = listing(sha)
+            if entries is None:
+                logging.warning("Tree %s (%s) is truncated; uploading every file", sha, prefix)
+                return None
+            for name, (kind, child_sha) in entries.items():
+                if kind == "blob":
+                    blobs[f"{prefix}/{name}"] = child_sha
+                elif kind == "tree":
+                    pending.append((f"{prefix}/{name}", child_sha))
+        # Yalnızca bu çalışmada kullanılan listeler saklanır; eskiler kendiliğinden düşer
+        write_file(BASE_TREE_CACHE_PATH, json.dumps({"trees": used}, sort_keys=True))
+        logging.info("Base tree listing: %d directories, %d fetched", len(used), fetched)
+        metrics.count("github.trees_fetched", fetched)
+        return blobs
+
+    def _upload_blob(self, content: str) -> str:
+        blob = self._request("POST", f"/repos/{self.repo}/git/blobs", json={"content": content, "encoding": "utf-8"})
+        return blob["sha"]
+
+    def open_pr(self, branch_suffix: str, title: str, body: str, files: Dict[str, Optional[str]]) -> None:
+        """Open a PR that writes ``files`` (``None`` content deletes the path) on the default branch.
+
+        Blob SHAs are computed locally and compared with the base tree, so only new or
+        changed blobs are uploaded (in parallel) and the tree request carries just the delta.
+        """
         self._ensure_repo()
         branch_name = f"{PR_BRANCH_PREFIX}{branch_suffix}"
         logging.info("Preparing PR %s", branch_name)
@@ -138,6 +408,29 @@ class GitHubAgent:
         base_sha = ref["object"]["sha"]
         base_commit = self._request("GET", f"/repos/{self.repo}/git/commits/{base_sha}")
         base_tree_sha = base_commit["tree"]["sha"]
+        base_blobs = self._base_tree_blobs(base_tree_sha)
+        # Delta against the base tree
+        uploads: Dict[str, str] = {}
+        deletions: List[str] = []
+        news_prefix = NEWS_DIR.as_posix() + "/"
+        for path, content in files.items():
+            # Taban listesi yalnızca news/ altını kapsar; dışındaki yollar bilinmiyor sayılır
+            known = base_blobs if base_blobs is not None and path.startswith(news_prefix) else None
+            if content is None:
+                if known is None or path in known:
+                    deletions.append(path)
+                continue
+            if known is not None and known.get(path) == git_blob_sha(content):
+                continue
+            uploads[path] = content
+        if not uploads and not deletions:
+            logging.info("All %d files already match %s; skipping PR", len(files), DEFAULT_BRANCH)
+            return
+        logging.info("Uploading %d changed blobs and %d deletions (%d files checked)", len(uploads), len(deletions), len(files))
+        metrics.count("github.blobs_uploaded", len(uploads))
+        metrics.count("github.paths_deleted", len(deletions))
+        with ThreadPoolExecutor(max_workers=GITHUB_UPLOAD_WORKERS, thread_name_prefix="blobs") as executor:
+            blob_shas = dict(zip(uploads, executor.map(self._upload_blob, uploads.values())))
         # Create branch
         try:
             self._request(
@@ -149,9 +442,8 @@ class GitHubAgent:
             if "Reference already exists" not in str(exc):
                 raise
         # Create tree
-        tree_entries = []
-        for path, content in files.items():
-            tree_entries.append({"path": path, "mode": "100644", "type": "blob", "content": content})
+        tree_entries = [{"path": path, "mode": "100644", "type": "blob", "sha": sha} for path, sha in sorted(blob_shas.items())]
+        tree_entries.extend({"path": path, "mode": "100644", "type": "blob", "sha": None} for path in sorted(deletions))
         tree = self._request(
             "POST",
             f"/repos/{self.repo}/git/trees",
@@ -178,35 +470,30 @@ class GitHubAgent:
         logging.info("Opened PR %s", branch_name)
 
 
-def run_agent(dry_run: bool) -> None:
-    store = StateStore()
+def run_agent(dry_run: bool, full: bool = False) -> None:
+    store = open_state_store()
     store.load()
     agent = GitHubAgent(token=os.environ.get("GITHUB_TOKEN"), repo=os.environ.get("GITHUB_REPOSITORY"))
+    # Elle yapılan değişiklikler için --full; aksi halde yalnızca eklenen/silinen kalemler
+    dirty_ids: Optional[Set[str]] = None if full else set()
     if dry_run or not agent.token:
         logging.info("Running in filesystem sync mode")
-        agent.sync_to_filesystem(store.values())
+        with metrics.span("github.markdown_sync"):
+            agent.sync_to_filesystem(store, dirty_ids=dirty_ids, full=full)
     else:
         logging.info("Running in GitHub PR mode")
-        groups = group_by_status(store.values())
-        files: Dict[str, str] = {}
-        for status, bucket in groups.items():
-            for item in bucket:
-                path = f"news/{status}/{item.id}.md"
-                files[path] = build_markdown(item)
-        files[str(INDEX_PATH)] = render_index(groups)
-        branch_suffix = dt.datetime.utcnow().strftime("%Y%m%d%H%M%S")
-        title = "[codex] Sync AI news"
-        body = "Automated sync of AI news content."
-        agent.open_pr(branch_suffix, title, body, files)
+        agent.sync(store, dirty_ids=dirty_ids, full=full)
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("--full", action="store_true", help="Ignore the Markdown manifest and re-render every file")
     args = parser.parse_args()
     configure_logging()
-    run_agent(dry_run=args.dry_run)
+    run_agent(dry_run=args.dry_run, full=args.full)
 
 
 if __name__ == "__main__":
-    main()
+    with metrics.run("github_agent"):
+        main()
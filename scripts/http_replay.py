@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""Record/replay HTTP transport for offline, deterministic and load-test runs."""
+from __future__ import annotations
+
+import argparse
+import base64
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# "" (canlı), "record" veya "replay"
+HTTP_MODE = os.environ.get("HTTP_MODE", "").lower()
+HTTP_FIXTURES_DIR = pathlib.Path(os.environ.get("HTTP_FIXTURES_DIR", "fixtures/http"))
+HTTP_REPLAY_LATENCY_MS = os.environ.get("HTTP_REPLAY_LATENCY_MS", "0")
+HTTP_REPLAY_ERROR_RATE = float(os.environ.get("HTTP_REPLAY_ERROR_RATE", "0"))
+HTTP_REPLAY_ERROR_STATUS = os.environ.get("HTTP_REPLAY_ERROR_STATUS", "")
+HTTP_REPLAY_SEED = os.environ.get("HTTP_REPLAY_SEED")
+
+# Replay edilen gövde zaten çözülmüş olduğu için bu başlıklar taşınmaz
+_HOP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+Body = Union[str, bytes, None]
+
+
+def _canonical_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, query, ""))
+
+
+def _loose_key(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    return f"{method.upper()} {parts.netloc.lower()}{parts.path}"
+
+
+def _body_bytes(body: Body) -> bytes:
+    if body is None:
+        return b""
+    return body if isinstance(body, bytes) else body.encode("utf-8")
+
+
+class FixtureStore:
+    """Response fixtures on disk, one JSON file per distinct request.
+
+    Requests match on method, URL (query order ignored) and body hash; failing that,
+    any fixture recorded for the same method, host and path is replayed in rotation,
+    so hand-written or synthesized fixtures serve arbitrary query strings.
+    """
+
+    def __init__(self, directory: pathlib.Path = HTTP_FIXTURES_DIR) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._loose: Optional[Dict[str, List[pathlib.Path]]] = None
+        self._turn: Dict[str, int] = {}
+
+    def path_for(self, method: str, url: str, body: Body) -> pathlib.Path:
+        key = f"{method.upper()} {_canonical_url(url)}\n".encode("utf-8") + hashlib.sha256(_body_bytes(body)).digest()
+        host = urlsplit(url).netloc.lower() or "unknown"
+        return self.directory / host / f"{method.lower()}-{hashlib.sha1(key).hexdigest()[:20]}.json"
+
+    def save(self, method: str, url: str, body: Body, status: int, headers: Dict[str, str], content: bytes) -> pathlib.Path:
+        fixture: Dict[str, object] = {
+            "method": method.upper(),
+            "url": _canonical_url(url),
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k.lower() not in _HOP_HEADERS and k.lower() != "set-cookie"},
+            "recorded_at": dt.datetime.now(dt.timezone.utc).isoformat(),
+        }
+        try:
+            fixture["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            fixture["base64"] = base64.b64encode(content).decode("ascii")
+        path = self.path_for(method, url, body)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(fixture, ensure_ascii=False, indent=1) + "\n", encoding="utf-8")
+        with self._lock:
+            if self._loose is not None:
+                paths = self._loose.setdefault(_loose_key(method, url), [])
+                if path not in paths:
+                    paths.append(path)
+        return path
+
+    def lookup(self, method: str, url: str, body: Body) -> Optional[Dict[str, object]]:
+        path = self.path_for(method, url, body)
+        if not path.exists():
+            key = _loose_key(method, url)
+            with self._lock:
+                candidates = self._loose_index().get(key)
+                if not candidates:
+                    return None
+                turn = self._turn.get(key, 0)
+                self._turn[key] = turn + 1
+            path = candidates[turn % len(candidates)]
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _loose_index(self) -> Dict[str, List[pathlib.Path]]:
+        if self._loose is None:
+            self._loose = {}
+            for path in sorted(self.directory.glob("*/*.json")):
+                fixture = json.loads(path.read_text(encoding="utf-8"))
+                self._loose.setdefault(_loose_key(str(fixture["method"]), str(fixture["url"])), []).append(path)
+        return self._loose
+
+    @staticmethod
+    def content(fixture: Dict[str, object]) -> bytes:
+        if "base64" in fixture:
+            return base64.b64decode(str(fixture["base64"]))
+        return str(fixture.get("text", "")).encode("utf-8")
+
+
+class FaultInjector:
+    """Injected latency (``"50"`` or ``"20-200"`` ms) and a random error rate for replay."""
+
+    def __init__(
+        self,
+        latency_ms: str = HTTP_REPLAY_LATENCY_MS,
+        error_rate: float = HTTP_REPLAY_ERROR_RATE,
+        error_status: str = HTTP_REPLAY_ERROR_STATUS,
+        seed: Optional[str] = HTTP_REPLAY_SEED,
+    ) -> None:
+        low, _, high = latency_ms.partition("-")
+        self.latency = (float(low or 0) / 1000, float(high or low or 0) / 1000)
+        self.error_rate = error_rate
+        self.error_status = int(error_status) if error_status else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        with self._lock:
+            return self._rng.uniform(*self.latency)
+
+    def fails(self) -> bool:
+        if self.error_rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Live ``HTTPAdapter`` that also writes every response to the fixture store."""
+
+    def __init__(self, store: FixtureStore, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.store = store
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        response = super().send(request, **kwargs)
+        self.store.save(request.method or "GET", request.url or "", request.body, response.status_code, dict(response.headers), response.content)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Serves responses from the fixture store without touching the network."""
+
+    def __init__(self, store: FixtureStore, faults: Optional[FaultInjector] = None) -> None:
+        super().__init__()
+        self.store = store
+        self.faults = faults or FaultInjector()
+
+    def send(self, request: requests.PreparedRequest, stream=False, timeout=None, verify=True, cert=None, proxies=None) -> requests.Response:
+        method, url = request.method or "GET", request.url or ""
+        delay = self.faults.delay()
+        if delay:
+            time.sleep(delay)
+        if self.faults.fails():
+            if self.faults.error_status is None:
+                raise requests.ConnectionError(f"Injected replay failure for {method} {url}", request=request)
+            return self._response(request, self.faults.error_status, {"Retry-After": "1"}, b"", delay)
+        fixture = self.store.lookup(method, url, request.body)
+        if fixture is None:
+            raise requests.ConnectionError(f"No recorded fixture for {method} {url}", request=request)
+        return self._response(request, int(fixture["status"]), dict(fixture.get("headers") or {}), FixtureStore.content(fixture), delay)  # type: ignore[arg-type]
+
+    @staticmethod
+    def _response(request: requests.PreparedRequest, status: int, headers: Dict[str, str], content: bytes, delay: float) -> requests.Response:
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        response._content = content
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url or ""
+        response.request = request
+        response.reason = "Replayed"
+        response.elapsed = dt.timedelta(seconds=delay)
+        return response
+
+    def close(self) -> None:
+        pass
+
+
+_store: Optional[FixtureStore] = None
+_faults: Optional[FaultInjector] = None
+
+
+def _shared() -> Tuple[FixtureStore, FaultInjector]:
+    global _store, _faults
+    if _store is None or _faults is None:
+        _store, _faults = FixtureStore(), FaultInjector()
+    return _store, _faults
+
+
+def mount(session: requests.Session, pool_size: int = 10) -> requests.Session:
+    """Mount the adapter for ``HTTP_MODE`` (live, record or replay) on ``session``."""
+    adapter: BaseAdapter
+    if HTTP_MODE == "replay":
+        store, faults = _shared()
+        adapter = ReplayAdapter(store, faults)
+    elif HTTP_MODE == "record":
+        adapter = RecordingAdapter(_shared()[0], pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def openai_http_client():
+    """``httpx.Client`` routing OpenAI SDK calls through the fixture store, or ``None`` when live."""
+    if HTTP_MODE not in ("record", "replay"):
+        return None
+    import httpx  # openai SDK bağımlılığı; yalnızca record/replay modunda gerekir
+
+    store, faults = _shared()
+
+    class FixtureTransport(httpx.BaseTransport):
+        def __init__(self) -> None:
+            self.live = httpx.HTTPTransport() if HTTP_MODE == "record" else None
+
+        def handle_request(self, request: httpx.Request) -> httpx.Response:
+            url, body = str(request.url), request.read()
+            if self.live is not None:
+                response = self.live.handle_request(request)
+                content = response.read()
+                store.save(request.method, url, body, response.status_code, dict(response.headers), content)
+                headers = {k: v for k, v in response.headers.items() if k.lower() not in _HOP_HEADERS}
+                return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+            delay = faults.delay()
+            if delay:
+                time.sleep(delay)
+            if faults.fails():
+                if faults.error_status is None:
+                    raise httpx.ConnectError(f"Injected replay failure for {request.method} {url}", request=request)
+                return httpx.Response(faults.error_status, headers={"Retry-After": "1"}, request=request)
+            fixture = store.lookup(request.method, url, body)
+            if fixture is None:
+                raise httpx.ConnectError(f"No recorded fixture for {request.method} {url}", request=request)
+            return httpx.Response(int(fixture["status"]), headers=dict(fixture.get("headers") or {}), content=FixtureStore.content(fixture), request=request)  # type: ignore[arg-type]
+
+    return httpx.Client(transport=FixtureTransport())
+
+
+def synthesize(store: FixtureStore, items_per_source: int, seed: int = 1) -> int:
+    """Write fixtures for every fetch source plus Slack, scaled to ``items_per_source``.
+
+    Feed items come from the benchmark's synthetic corpus (published around now), so a
+    replayed run exercises dedupe, scoring, posting and promotion at that volume.
+    """
+    from benchmark import SyntheticCorpus
+    from fetch_and_post_daily import CURATED_FEEDS, _substack_feed_urls
+
+    now = dt.datetime.now(dt.timezone.utc)
+    json_headers = {"Content-Type": "application/json; charset=utf-8"}
+    rss_headers = {"Content-Type": "application/rss+xml; charset=utf-8"}
+    written = 0
+
+    def corpus(offset: int) -> List[Dict[str, str]]:
+        return SyntheticCorpus(items_per_source, seed=seed + offset, now=now).feed_items()
+
+    def rss(items: List[Dict[str, str]]) -> bytes:
+        from xml.sax.saxutils import escape
+
+        entries = []
+        for n, item in enumerate(items):
+            published = now - dt.timedelta(minutes=n % 600)
+            entries.append(
+                f"<item><title>{escape(item['title'])} AI</title><link>{escape(item['url'])}</link>"
+                f"<pubDate>{published.strftime('%a, %d %b %Y %H:%M:%S +0000')}</pubDate></item>"
+            )
+        return ("<?xml version='1.0' encoding='UTF-8'?><rss version='2.0'><channel>" + "".join(entries) + "</channel></rss>").encode("utf-8")
+
+    gdelt = {"articles": [{"url": i["url"], "title": f"{i['title']} AI", "source": "GDELT", "seendate": now.strftime("%Y%m%d%H%M%S")} for i in corpus(0)]}
+    store.save("GET", "https://api.gdeltproject.org/api/v2/doc/doc", None, 200, json_headers, json.dumps(gdelt).encode("utf-8"))
+    hits = {"hits": [{"url": i["url"], "title": f"{i['title']} AI", "created_at": now.isoformat()} for i in corpus(1)]}
+    store.save("GET", "https://hn.algolia.com/api/v1/search", None, 200, json_headers, json.dumps(hits).encode("utf-8"))
+    store.save("GET", "https://news.google.com/rss/search", None, 200, rss_headers, rss(corpus(2)))
+    written += 3
+    for offset, url in enumerate(list(CURATED_FEEDS.values()) + _substack_feed_urls(), start=3):
+        store.save("GET", url, None, 200, rss_headers, rss(corpus(offset)))
+        written += 1
+    slack = {
+        "chat.postMessage": {"ok": True, "ts": f"{now.timestamp():.6f}"},
+        "chat.update": {"ok": True, "ts": f"{now.timestamp():.6f}"},
+        "chat.delete": {"ok": True},
+        "pins.add": {"ok": True},
+        "pins.list": {"ok": True, "items": []},
+        "conversations.history": {"ok": True, "messages": []},
+        "conversations.replies": {"ok": True, "messages": []},
+        "reactions.get": {"ok": True, "message": {}},
+    }
+    for method, payload in slack.items():
+        http_method = "GET" if method in ("pins.list", "conversations.history", "conversations.replies", "reactions.get") else "POST"
+        store.save(http_method, f"https://slack.com/api/{method}", None, 200, json_headers, json.dumps(payload).encode("utf-8"))
+        written += 1
+    return written
+
+
+def main() -> int:
+    from common import configure_logging
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    sub = parser.add_subparsers(dest="command", required=True)
+    synth = sub.add_parser("synthesize", help="Write synthetic fixtures for every source and Slack")
+    synth.add_argument("--items", type=int, default=1000, help="Items per feed source")
+    synth.add_argument("--seed", type=int, default=1)
+    synth.add_argument("--dir", type=pathlib.Path, default=HTTP_FIXTURES_DIR)
+    args = parser.parse_args()
+    configure_logging()
+    count = synthesize(FixtureStore(args.dir), args.items, seed=args.seed)
+    logging.info("Wrote %d synthetic fixtures to %s", count, args.dir)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""One-time migration of stored items to the schema with epoch timestamp fields."""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import pathlib
+import sys
+
+from common import STATE_BACKEND, STATE_PATH, NewsItem, StateStore, configure_logging
+
+
+def migrate_jsonl(path: pathlib.Path) -> int:
+    """Rewrite the snapshot (folding in any journal) so every record carries its epoch fields."""
+    pending = 0
+    for source in (path, path.with_suffix(path.suffix + ".journal")):
+        if not source.exists():
+            continue
+        with source.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue
+                if "op" in data:
+                    data = data.get("item") or {}
+                if data and NewsItem.needs_migration(data):
+                    pending += 1
+    if not pending:
+        return 0
+    # load() epoch alanlarını doldurur, journal'sız save() tam snapshot yazar
+    store = StateStore(path, journal=False)
+    store.load()
+    store.save()
+    return pending
+
+
+def migrate_sqlite() -> int:
+    from sqlite_store import SQLiteStateStore
+
+    store = SQLiteStateStore()
+    pending = store.conn.execute("SELECT COUNT(*) FROM items WHERE instr(data, '\"published_epoch\"') = 0").fetchone()[0]
+    if pending:
+        store.load()
+        store.values()
+        store.save()
+    store.close()
+    return pending
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--state", type=pathlib.Path, default=STATE_PATH, help="JSONL snapshot to migrate (jsonl backend)")
+    args = parser.parse_args()
+    configure_logging()
+    migrated = migrate_sqlite() if STATE_BACKEND == "sqlite" else migrate_jsonl(args.state)
+    if migrated:
+        logging.info("Migrated %d items to epoch timestamp fields", migrated)
+    else:
+        logging.info("State already has epoch timestamp fields; nothing to migrate")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
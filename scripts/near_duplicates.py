@@ -0,0 +1,102 @@
+"""MinHash/LSH index for clustering near-duplicate headlines."""
+from __future__ import annotations
+
+import hashlib
+import random
+import re
+from typing import Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+MIN_TOKENS = 3
+
+STOPWORDS = frozenset(
+    "a an and are as at be been by for from has have in is it its of on or says said that the this to was were will with".split()
+)
+# "Title - Publisher" / "Title | Publisher" son ekleri (Google News vb.)
+_PUBLISHER_SUFFIX_RE = re.compile(r"\s+[-–—|]\s+[^-–—|]{1,40}$")
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _stem(token: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(token) > len(suffix) + 3 and token.endswith(suffix):
+            return token[: -len(suffix)]
+    return token
+
+
+def title_tokens(title: str, shingle_size: int = 1) -> FrozenSet[str]:
+    """Normalize a headline into a set of word shingles for similarity checks."""
+    text = _PUBLISHER_SUFFIX_RE.sub("", (title or "").strip()).lower()
+    words = [_stem(w) for w in _TOKEN_RE.findall(text) if w not in STOPWORDS]
+    if shingle_size <= 1 or len(words) < shingle_size:
+        return frozenset(words)
+    return frozenset(" ".join(words[i : i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _band_layout(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Pick (bands, rows) whose LSH S-curve midpoint is closest to ``threshold``."""
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class MinHashLSH:
+    """Banded MinHash index; candidates are verified with exact Jaccard similarity."""
+
+    def __init__(self, threshold: float = 0.7, num_perm: int = 64, seed: int = 1) -> None:
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = _band_layout(num_perm, threshold)
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME)) for _ in range(num_perm)]
+        self._buckets: List[Dict[Tuple[int, ...], List[Hashable]]] = [{} for _ in range(self.bands)]
+        self._tokens: Dict[Hashable, FrozenSet[str]] = {}
+
+    def signature(self, tokens: FrozenSet[str]) -> Tuple[int, ...]:
+        hashes = [_token_hash(t) for t in tokens]
+        return tuple(min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes) for a, b in self._perms)
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[Tuple[int, ...]]:
+        return [signature[i * self.rows : (i + 1) * self.rows] for i in range(self.bands)]
+
+    def insert(self, key: Hashable, tokens: FrozenSet[str], signature: Optional[Tuple[int, ...]] = None) -> None:
+        if len(tokens) < MIN_TOKENS:
+            return
+        self._tokens[key] = tokens
+        for band, band_key in zip(self._buckets, self._band_keys(signature or self.signature(tokens))):
+            band.setdefault(band_key, []).append(key)
+
+    def query(self, tokens: FrozenSet[str], signature: Optional[Tuple[int, ...]] = None) -> Optional[Hashable]:
+        """Return the most similar indexed key at or above the threshold, if any."""
+        if len(tokens) < MIN_TOKENS or not self._tokens:
+            return None
+        best_key: Optional[Hashable] = None
+        best_score = 0.0
+        seen = set()
+        for band, band_key in zip(self._buckets, self._band_keys(signature or self.signature(tokens))):
+            for key in band.get(band_key, ()):
+                if key in seen:
+                    continue
+                seen.add(key)
+                score = jaccard(tokens, self._tokens[key])
+                if score >= self.threshold and score > best_score:
+                    best_key, best_score = key, score
+        return best_key
@@ -0,0 +1,63 @@
+"""Write-ahead journal for Slack posts so interrupted runs neither lose nor repeat messages."""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import pathlib
+import time
+from typing import Dict, List, Optional
+
+from common import STATE_PATH, NewsItem
+
+POSTING_JOURNAL_PATH = pathlib.Path(os.environ.get("POSTING_JOURNAL_PATH", str(STATE_PATH.parent / "posting_journal.jsonl")))
+
+
+class PostingJournal:
+    """Durable ``intent``/``posted`` records for every Slack post of a run.
+
+    ``intent`` is fsynced before the message is sent and ``posted`` (with the Slack
+    ``ts``) right after, so a crash between the two is detectable. The journal is
+    cleared once the state store has been saved.
+    """
+
+    def __init__(self, path: pathlib.Path = POSTING_JOURNAL_PATH) -> None:
+        self.path = path
+
+    def _append(self, record: Dict[str, object]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_intent(self, item: NewsItem, channel: str) -> None:
+        self._append({"op": "intent", "id": item.id, "channel": channel, "at": time.time(), "item": item.to_json()})
+
+    def record_posted(self, item_id: str, ts: Optional[str]) -> None:
+        self._append({"op": "posted", "id": item_id, "ts": ts})
+
+    def entries(self) -> List[Dict[str, object]]:
+        """Return one entry per journaled item: intent fields plus ``posted``/``ts`` if sent."""
+        if not self.path.exists():
+            return []
+        entries: Dict[str, Dict[str, object]] = {}
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logging.warning("Skipping truncated posting journal record in %s", self.path)
+                    continue
+                if record.get("op") == "intent":
+                    entries[record["id"]] = dict(record, posted=False, ts=None)
+                elif record.get("op") == "posted" and record["id"] in entries:
+                    entries[record["id"]].update(posted=True, ts=record.get("ts"))
+        return list(entries.values())
+
+    def clear(self) -> None:
+        if self.path.exists():
+            self.path.unlink()
@@ -8,12 +8,16 @@ import json
 import logging
 import os
 import pathlib
-from typing import Dict, Iterable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-import requests
-
-from common import NewsItem, StateStore, configure_logging, parse_datetime
+from batch_scoring import value_scores
+from common import STATE_BACKEND, NewsItem, StateStore, configure_logging, open_state_store
 from github_agent import GitHubAgent
+from run_metrics import metrics
+from seen_ids import SeenIds
+from slack_transport import SlackTransport
+from transition_index import TransitionIndex
 
 SLACK_BOT_TOKEN = os.environ.get("SLACK_BOT_TOKEN")
 SLACK_CH_DAILY = os.environ.get("SLACK_CH_DAILY")
@@ -33,31 +37,79 @@ W_ACC, W_ENG, W_PIN, W_AGE = 0.5, 0.3, 0.1, 0.1
 PROMOTE_WEEKLY_SCORE = 0.75
 PROMOTE_MONTHLY_SCORE = 0.85
 
+HISTORY_PAGE_SIZE = 200
+CHANNEL_MAP = {"daily": SLACK_CH_DAILY, "weekly": SLACK_CH_WEEKLY, "monthly": SLACK_CH_MONTHLY}
+TTL_BASE_HOURS = {"daily": TTL_DAILY_HOURS, "weekly": TTL_WEEKLY_HOURS, "monthly": TTL_MONTHLY_HOURS}
+# SQLite'ta ts/yayın indeksleri adayları zaten bulur; transitions.jsonl yalnızca JSONL state için
+USE_TRANSITION_INDEX = STATE_BACKEND != "sqlite"
+# Eşikler değişince kayıtlı geçiş zamanları geçersiz olur
+RULES_SIGNATURE = json.dumps([
+    PROMOTE_WEEKLY_HOURS, PROMOTE_MONTHLY_HOURS, TTL_DAILY_HOURS, TTL_WEEKLY_HOURS, TTL_MONTHLY_HOURS,
+    W_ACC, W_ENG, W_PIN, W_AGE, PROMOTE_WEEKLY_SCORE, PROMOTE_MONTHLY_SCORE,
+])
+
 
 class SlackMetricsClient:
-    def __init__(self, token: Optional[str]) -> None:
+    def __init__(self, token: Optional[str], transport: Optional[SlackTransport] = None) -> None:
         self.token = token
-        self.session = requests.Session()
-        self.session.headers.update({"User-Agent": "ai-news-pipeline/1.0"})
-        if token:
-            self.session.headers.update({"Authorization": f"Bearer {token}"})
+        self.transport = transport or SlackTransport(token)
 
     def _get(self, method: str, params: Dict) -> Dict:
         if not self.token:
             return {"ok": False}
-        response = self.session.get(f"https://slack.com/api/{method}", params=params, timeout=30)
-        response.raise_for_status()
-        return response.json()
+        return self.transport.call(method, "GET", params=params)
 
     def _post(self, method: str, payload: Dict) -> Dict:
         if not self.token:
             logging.info("[DRY RUN] Would call %s with %s", method, payload)
             return {"ok": False}
-        response = self.session.post(f"https://slack.com/api/{method}", data=payload, timeout=30)
-        response.raise_for_status()
-        return response.json()
+        return self.transport.call(method, data=payload)
+
+    def fetch_channel_metrics(self, channel: str, timestamps: Iterable[str]) -> Dict[str, Dict[str, int | bool]]:
+        """Harvest metrics for many messages in one channel with batched calls.
+
+        Pins come from a single ``pins.list``; reply counts and reactions come from the
+        ``conversations.history`` pages spanning the tracked timestamps. Messages missing
+        from history fall back to the per-item ``fetch_metrics`` calls.
+        """
+        wanted = set(timestamps)
+        results: Dict[str, Dict[str, int | bool]] = {}
+        if not self.token or not wanted:
+            return {ts: {"replies": 0, "pinned": False, "pushpins": 0} for ts in wanted}
+        pinned_ts = self._pinned_timestamps(channel)
+        params: Dict[str, object] = {
+            "channel": channel,
+            "oldest": min(wanted, key=float),
+            "latest": max(wanted, key=float),
+            "inclusive": "true",
+            "limit": HISTORY_PAGE_SIZE,
+        }
+        while True:
+            history = self._get("conversations.history", params)
+            if not history.get("ok"):
+                break
+            for message in history.get("messages", []):
+                ts = message.get("ts")
+                if ts not in wanted:
+                    continue
+                pushpins = sum(r.get("count", 0) for r in message.get("reactions", []) if r.get("name") == "pushpin")
+                results[ts] = {"replies": int(message.get("reply_count", 0)), "pinned": ts in pinned_ts, "pushpins": pushpins}
+            cursor = (history.get("response_metadata") or {}).get("next_cursor")
+            if not cursor or len(results) == len(wanted):
+                break
+            params["cursor"] = cursor
+        for ts in wanted - results.keys():
+            metrics = self.fetch_metrics(channel, ts, pinned_ts=pinned_ts)
+            results[ts] = metrics
+        return results
+
+    def _pinned_timestamps(self, channel: str) -> Set[str]:
+        pins_resp = self._get("pins.list", {"channel": channel})
+        if not pins_resp.get("ok"):
+            return set()
+        return {item.get("message", {}).get("ts") for item in pins_resp.get("items", []) if item.get("message")}
 
-    def fetch_metrics(self, channel: str, ts: str) -> Dict[str, int | bool]:
+    def fetch_metrics(self, channel: str, ts: str, pinned_ts: Optional[Set[str]] = None) -> Dict[str, int | bool]:
         replies = 0
         pinned = False
         pushpin_reactions = 0
@@ -66,12 +118,9 @@ class SlackMetricsClient:
         replies_resp = self._get("conversations.replies", {"channel": channel, "ts": ts})
         if replies_resp.get("ok"):
             replies = max(len(replies_resp.get("messages", [])) - 1, 0)
-        pins_resp = self._get("pins.list", {"channel": channel})
-        if pins_resp.get("ok"):
-            for item in pins_resp.get("items", []):
-                if item.get("message", {}).get("ts") == ts:
-                    pinned = True
-                    break
+        if pinned_ts is None:
+            pinned_ts = self._pinned_timestamps(channel)
+        pinned = ts in pinned_ts
         reactions_resp = self._get("reactions.get", {"channel": channel, "timestamp": ts})
         if reactions_resp.get("ok"):
             message = reactions_resp.get("message", {})
@@ -88,6 +137,23 @@ class SlackMetricsClient:
         if not resp.get("ok"):
             logging.warning("Failed to delete message: %s", resp)
 
+    def delete_messages(self, messages: Iterable[Tuple[str, str]]) -> None:
+        """Delete ``(channel, ts)`` pairs concurrently through the shared transport."""
+        messages = list(messages)
+        if not self.token:
+            for channel, ts in messages:
+                self.delete_message(channel, ts)
+            return
+        futures = [self.transport.submit("chat.delete", data={"channel": channel, "ts": ts}) for channel, ts in messages]
+        for future in futures:
+            try:
+                resp = future.result()
+            except Exception as exc:
+                logging.warning("Failed to delete message: %s", exc)
+                continue
+            if not resp.get("ok"):
+                logging.warning("Failed to delete message: %s", resp)
+
     def post_overview(self, channel: str, text: str, ts: Optional[str]) -> Optional[str]:
         if not self.token:
             logging.info("[DRY RUN] Would update overview in %s", channel)
@@ -106,11 +172,18 @@ class SlackMetricsClient:
         return new_ts
 
 
+def _age_hours(item: NewsItem, now: dt.datetime) -> float:
+    # Tarihi çözülemeyen kalem yeni sayılır
+    if item.published_epoch is None:
+        return 0.0
+    return (now.timestamp() - item.published_epoch) / 3600
+
+
 def value_score(item: NewsItem, now: dt.datetime) -> float:
     acc = float(item.accuracy)
     eng = min(item.replies / 5, 1.0)
     pin = 1.0 if item.pinned else 0.0
-    age_h = max((now - parse_datetime(item.published_utc)).total_seconds() / 3600, 0)
+    age_h = max(_age_hours(item, now), 0)
     age_factor = max(0.0, 1.0 - min(age_h / 24, 1.0))
     score = W_ACC * acc + W_ENG * eng + W_PIN * pin + W_AGE * age_factor
     return round(float(score), 3)
@@ -125,9 +198,7 @@ def dynamic_ttl_hours(base_hours: int, score: float) -> int:
 
 
 def should_promote_weekly(item: NewsItem, now: dt.datetime) -> bool:
-    published = parse_datetime(item.published_utc)
-    age_hours = (now - published).total_seconds() / 3600
-    if age_hours < PROMOTE_WEEKLY_HOURS:
+    if _age_hours(item, now) < PROMOTE_WEEKLY_HOURS:
         return False
     if item.accuracy < 0.7:
         return False
@@ -135,33 +206,90 @@ def should_promote_weekly(item: NewsItem, now: dt.datetime) -> bool:
 
 
 def should_promote_monthly(item: NewsItem, now: dt.datetime) -> bool:
-    published = parse_datetime(item.published_utc)
-    age_hours = (now - published).total_seconds() / 3600
-    if age_hours < PROMOTE_MONTHLY_HOURS:
+    if _age_hours(item, now) < PROMOTE_MONTHLY_HOURS:
         return False
     if item.accuracy < 0.8:
         return False
     return item.value_score >= PROMOTE_MONTHLY_SCORE or item.corroborations >= 3 or item.replies >= 5
 
 
-def slack_ts_to_datetime(ts: str) -> dt.datetime:
-    seconds = float(ts)
-    return dt.datetime.fromtimestamp(seconds, tz=dt.timezone.utc)
-
-
 def expired(item: NewsItem, now: dt.datetime) -> bool:
-    base = TTL_DAILY_HOURS if item.status == "daily" else TTL_WEEKLY_HOURS if item.status == "weekly" else TTL_MONTHLY_HOURS
-    ttl = dynamic_ttl_hours(base, item.value_score)
-    ts: Optional[dt.datetime] = None
-    if item.status == "daily" and item.ts_daily:
-        ts = slack_ts_to_datetime(item.ts_daily)
-    if item.status == "weekly" and item.ts_weekly:
-        ts = slack_ts_to_datetime(item.ts_weekly)
-    if item.status == "monthly" and item.ts_monthly:
-        ts = slack_ts_to_datetime(item.ts_monthly)
-    if not ts:
+    base = TTL_BASE_HOURS.get(item.status)
+    posted = _current_epoch(item)
+    if not base or not posted:
         return False
-    return (now - ts).total_seconds() / 3600 >= ttl
+    ttl = dynamic_ttl_hours(base, item.value_score)
+    return (now.timestamp() - posted) / 3600 >= ttl
+
+
+def next_transition(item: NewsItem, now: dt.datetime) -> Optional[float]:
+    """Earliest epoch second after ``now`` at which ``apply_rules`` could change ``item``.
+
+    Only the clock is considered; engagement changes are picked up by the index's rule key.
+    Returns ``None`` when the item can no longer move on time alone.
+    """
+    candidates: List[float] = []
+    published = item.published_epoch
+    if published is not None:
+        # Yaş etkisi 24 saatte sıfırlanır; o ana dek ValueScore (ve TTL) düşebilir
+        candidates.append(published + 24 * 3600)
+        if item.status == "daily":
+            candidates.append(published + PROMOTE_WEEKLY_HOURS * 3600)
+        if item.status in ("daily", "weekly"):
+            candidates.append(published + PROMOTE_MONTHLY_HOURS * 3600)
+    posted = _current_epoch(item)
+    base = TTL_BASE_HOURS.get(item.status)
+    if posted and base:
+        settled = W_ACC * float(item.accuracy) + W_ENG * min(item.replies / 5, 1.0) + W_PIN * (1.0 if item.pinned else 0.0)
+        floor = min(item.value_score, round(settled, 3))
+        candidates.append(posted + dynamic_ttl_hours(base, floor) * 3600)
+        candidates.append(posted + dynamic_ttl_hours(base, item.value_score) * 3600)
+    future = [t for t in candidates if t > now.timestamp()]
+    return min(future) if future else None
+
+
+def rule_candidates(store: StateStore, now: dt.datetime) -> List[NewsItem]:
+    """Items ``apply_rules`` could change at ``now``, found with the store's indexed queries.
+
+    An item can only expire once its current Slack post is older than the shortest TTL of
+    its status (``posted_before``) and only be promoted once it is old enough
+    (``published_before``); every other item is skipped without being read.
+    """
+    now_ts = now.timestamp()
+    selected: Dict[str, NewsItem] = {}
+    # Bir saniyelik pay: sınırdaki kalemler de alınır, kesin kararı apply_rules verir
+    for status, base in TTL_BASE_HOURS.items():
+        for item in store.posted_before(status, now_ts - dynamic_ttl_hours(base, 0.0) * 3600 + 1):
+            selected[item.id] = item
+    for status, hours in (("daily", PROMOTE_WEEKLY_HOURS), ("weekly", PROMOTE_MONTHLY_HOURS)):
+        for item in store.published_before(status, now_ts - hours * 3600 + 1):
+            selected[item.id] = item
+    return [selected[item_id] for item_id in sorted(selected)]
+
+
+def apply_rules(items: Iterable[NewsItem], now: dt.datetime) -> Tuple[List[NewsItem], List[NewsItem], List[NewsItem]]:
+    """Promote, archive or expire ``items`` in place; returns ``(promotions, removals, archives)``."""
+    promotions: List[NewsItem] = []
+    removals: List[NewsItem] = []
+    archives: List[NewsItem] = []
+    for item in items:
+        if item.status == "daily" and should_promote_weekly(item, now):
+            item.status = "weekly"
+            if not item.ts_weekly:
+                item.set_slack_ts("weekly", item.ts_daily)
+            promotions.append(item)
+        if item.status == "weekly" and should_promote_monthly(item, now):
+            item.status = "monthly"
+            if not item.ts_monthly:
+                item.set_slack_ts("monthly", item.ts_weekly)
+            promotions.append(item)
+        if expired(item, now):
+            if item.status == "monthly" and item.value_score >= 0.9:
+                item.status = "archived"
+                archives.append(item)
+            else:
+                removals.append(item)
+    return promotions, removals, archives
 
 
 def update_overview(slack: SlackMetricsClient, channel: Optional[str], items: Iterable[NewsItem], ts: Optional[str]) -> Optional[str]:
@@ -185,80 +313,180 @@ def save_overview_state(data: Dict[str, str]) -> None:
     OVERVIEW_STATE_PATH.write_text(json.dumps(data, indent=2), encoding="utf-8")
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description=__doc__)
-    parser.add_argument("--dry-run", action="store_true")
-    args = parser.parse_args()
+def _current_ts(item: NewsItem) -> Optional[str]:
+    return item.ts_daily if item.status == "daily" else item.ts_weekly if item.status == "weekly" else item.ts_monthly
 
-    configure_logging()
-    store = StateStore()
-    store.load()
-    slack = SlackMetricsClient(token=None if args.dry_run else SLACK_BOT_TOKEN)
-    now = dt.datetime.now(dt.timezone.utc)
 
-    # Update metrics
-    channel_map = {"daily": SLACK_CH_DAILY, "weekly": SLACK_CH_WEEKLY, "monthly": SLACK_CH_MONTHLY}
-    for item in store.values():
-        ts = item.ts_daily if item.status == "daily" else item.ts_weekly if item.status == "weekly" else item.ts_monthly
-        channel = channel_map.get(item.status)
-        if not ts or not channel:
-            continue
-        metrics = slack.fetch_metrics(channel, ts)
-        item.replies = int(metrics.get("replies", item.replies))
-        item.pinned = bool(metrics.get("pinned", item.pinned)) or int(metrics.get("pushpins", 0)) > 0
-        item.value_score = value_score(item, now)
+def _current_epoch(item: NewsItem) -> Optional[float]:
+    return item.ts_daily_epoch if item.status == "daily" else item.ts_weekly_epoch if item.status == "weekly" else item.ts_monthly_epoch
 
-    promotions: List[NewsItem] = []
-    removals: List[NewsItem] = []
-    archives: List[NewsItem] = []
-    for item in list(store.values()):
-        if item.status == "daily" and should_promote_weekly(item, now):
-            item.status = "weekly"
-            item.ts_weekly = item.ts_weekly or item.ts_daily
-            promotions.append(item)
-        if item.status == "weekly" and should_promote_monthly(item, now):
-            item.status = "monthly"
-            item.ts_monthly = item.ts_monthly or item.ts_weekly
-            promotions.append(item)
-        if expired(item, now):
-            if item.status == "monthly" and item.value_score >= 0.9:
-                item.status = "archived"
-                archives.append(item)
-            else:
-                removals.append(item)
 
+def refresh_metrics(store: StateStore, slack: SlackMetricsClient, now: dt.datetime) -> Set[str]:
+    """Harvest Slack replies/pins for every posted item and recompute its ValueScore.
+
+    Returns the ids whose replies or pin state changed.
+    """
+    tracked: Dict[str, List[Tuple[NewsItem, str]]] = {}
+    # Arşivlenen kalemlerin kanalı yok; durum sorgusu onları hiç okumaz
+    for status, channel in CHANNEL_MAP.items():
+        if not channel:
+            continue
+        for item in store.by_status(status):
+            ts = _current_ts(item)
+            if ts:
+                tracked.setdefault(channel, []).append((item, ts))
+    metrics.count("items.tracked", sum(len(entries) for entries in tracked.values()))
+    with metrics.span("slack_metrics"):
+        with ThreadPoolExecutor(max_workers=max(len(tracked), 1), thread_name_prefix="metrics") as executor:
+            harvested = {channel: executor.submit(slack.fetch_channel_metrics, channel, [ts for _, ts in entries]) for channel, entries in tracked.items()}
+        refreshed: List[NewsItem] = []
+        engaged: Set[str] = set()
+        for channel, entries in tracked.items():
+            channel_metrics = harvested[channel].result()
+            for item, ts in entries:
+                stats = channel_metrics[ts]
+                replies = int(stats.get("replies", item.replies))
+                pinned = bool(stats.get("pinned", item.pinned)) or int(stats.get("pushpins", 0)) > 0
+                if (replies, pinned) != (item.replies, item.pinned):
+                    engaged.add(item.id)
+                item.replies, item.pinned = replies, pinned
+                refreshed.append(item)
+    with metrics.span("value_scores"):
+        scores = value_scores(
+            [item.accuracy for item in refreshed],
+            [item.replies for item in refreshed],
+            [item.pinned for item in refreshed],
+            [item.published_epoch for item in refreshed],
+            now.timestamp(),
+            (W_ACC, W_ENG, W_PIN, W_AGE),
+        )
+        for item, score in zip(refreshed, scores):
+            item.value_score = score
+    return engaged
+
+
+def promote_and_expire(
+    store: StateStore,
+    seen: SeenIds,
+    slack: SlackMetricsClient,
+    now: dt.datetime,
+    index: Optional[TransitionIndex] = None,
+    changed_ids: Iterable[str] = (),
+) -> None:
+    """Apply promotion/expiry rules, delete expired Slack messages and update ``store``.
+
+    With an ``index`` only items whose next transition is due, new items and
+    ``changed_ids`` (e.g. engagement changes) are evaluated and then rescheduled;
+    without one the candidates come from ``rule_candidates``.
+    """
+    with metrics.span("rules"):
+        candidates = rule_candidates(store, now) if index is None else index.pending(store, changed_ids, now.timestamp())
+        promotions, removals, archives = apply_rules(candidates, now)
+    metrics.count("items.evaluated", len(candidates))
+    metrics.count("items.promoted", len(promotions))
+    metrics.count("items.removed", len(removals))
+    metrics.count("items.archived", len(archives))
+
+    deletions: List[Tuple[str, str]] = []
     for item in removals:
-        channel = channel_map.get(item.status)
-        ts = item.ts_daily if item.status == "daily" else item.ts_weekly if item.status == "weekly" else item.ts_monthly
+        channel = CHANNEL_MAP.get(item.status)
+        ts = _current_ts(item)
         if channel and ts:
-            slack.delete_message(channel, ts)
+            deletions.append((channel, ts))
         store.remove(item.id)
+        seen.add(item.id)
+        if index is not None:
+            index.discard(item.id)
+
+    with metrics.span("slack_delete"):
+        slack.delete_messages(deletions)
 
     for item in promotions + archives:
         store.upsert(item)
-    store.save()
+
+    if index is not None:
+        with metrics.span("reschedule"):
+            removed = {item.id for item in removals}
+            for item in candidates:
+                if item.id not in removed:
+                    index.schedule(item, next_transition(item, now))
+
+
+def refresh_overviews(store: StateStore, slack: SlackMetricsClient) -> None:
+    with metrics.span("overviews"):
+        overview_state = load_overview_state()
+        overview_state["daily"] = update_overview(
+            slack, SLACK_CH_DAILY, store.by_status("daily"), overview_state.get("daily")
+        )
+        overview_state["weekly"] = update_overview(
+            slack, SLACK_CH_WEEKLY, store.by_status("weekly"), overview_state.get("weekly")
+        )
+        overview_state["monthly"] = update_overview(
+            slack, SLACK_CH_MONTHLY, store.by_status("monthly"), overview_state.get("monthly")
+        )
+        save_overview_state({k: v for k, v in overview_state.items() if v})
+
+
+def load_transition_index() -> TransitionIndex:
+    index = TransitionIndex(rules=RULES_SIGNATURE)
+    index.load()
+    return index
+
+
+def run_cycle(
+    store: StateStore,
+    seen: SeenIds,
+    slack: SlackMetricsClient,
+    agent: GitHubAgent,
+    dry_run: bool = False,
+    index: Optional[TransitionIndex] = None,
+) -> None:
+    """One promotion pass over loaded state: metrics, rules, save, Markdown sync, overviews.
+
+    ``index`` lets a long-running caller keep the transition index in memory; otherwise
+    it is loaded from disk (JSONL state only). It is saved together with the state.
+    """
+    now = dt.datetime.now(dt.timezone.utc)
+    if index is None and USE_TRANSITION_INDEX:
+        index = load_transition_index()
+    engaged = refresh_metrics(store, slack, now)
+    promote_and_expire(store, seen, slack, now, index, changed_ids=engaged | store.changed_ids())
+    with metrics.span("save_state"):
+        store.save()
+        seen.save()
+        # State'ten sonra yazılır; arada kesilirse rule key farkı kalemi yeniden değerlendirtir
+        if index is not None:
+            index.save()
 
     # Sync markdown / PR
-    agent = GitHubAgent(token=os.environ.get("GITHUB_TOKEN"), repo=os.environ.get("GITHUB_REPOSITORY"))
-    if args.dry_run:
-        agent.sync_to_filesystem(store.values())
+    if dry_run:
+        with metrics.span("github.markdown_sync"):
+            agent.sync_to_filesystem(store, dirty_ids=store.changed_ids())
     else:
-        agent.sync(store.values())
-
-    # Update overviews
-    overview_state = load_overview_state()
-    overview_state["daily"] = update_overview(
-        slack, SLACK_CH_DAILY, filter(lambda i: i.status == "daily", store.values()), overview_state.get("daily")
-    )
-    overview_state["weekly"] = update_overview(
-        slack, SLACK_CH_WEEKLY, filter(lambda i: i.status == "weekly", store.values()), overview_state.get("weekly")
-    )
-    overview_state["monthly"] = update_overview(
-        slack, SLACK_CH_MONTHLY, filter(lambda i: i.status == "monthly", store.values()), overview_state.get("monthly")
-    )
-    save_overview_state({k: v for k, v in overview_state.items() if v})
+        agent.sync(store, dirty_ids=store.changed_ids())
+
+    refresh_overviews(store, slack)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    configure_logging()
+    with metrics.span("load_state"):
+        store = open_state_store()
+        store.load()
+        seen = SeenIds()
+        seen.load()
+    slack = SlackMetricsClient(token=None if args.dry_run else SLACK_BOT_TOKEN)
+    agent = GitHubAgent(token=os.environ.get("GITHUB_TOKEN"), repo=os.environ.get("GITHUB_REPOSITORY"))
+    run_cycle(store, seen, slack, agent, dry_run=args.dry_run)
+    if slack.token:
+        slack.transport.log_summary()
 
 
 if __name__ == "__main__":
-    main()
+    with metrics.run("promote_and_expire"):
+        main()
 
@@ -0,0 +1,162 @@
+"""Per-run timing, counters and HTTP telemetry written as a JSON metrics file."""
+from __future__ import annotations
+
+import contextlib
+import datetime as dt
+import json
+import logging
+import os
+import pathlib
+import threading
+import time
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+import requests
+
+RUN_METRICS_DIR = os.environ.get("RUN_METRICS_DIR", "metrics")
+# node_exporter textfile collector dizini; boşsa Prometheus çıktısı yazılmaz
+RUN_METRICS_TEXTFILE_DIR = os.environ.get("RUN_METRICS_TEXTFILE_DIR", "")
+
+
+class RunMetrics:
+    """Thread-safe collector for one script run.
+
+    ``span`` times a named stage (repeated spans accumulate), ``count`` adds to a
+    counter, and ``instrument`` hooks a ``requests.Session`` so every response is
+    tallied per host with bytes, latency and status codes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            self.spans: Dict[str, Dict[str, float]] = {}
+            self.counters: Dict[str, float] = {}
+            self.http: Dict[str, Dict[str, object]] = {}
+
+    @contextlib.contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_span(name, time.perf_counter() - started)
+
+    def record_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            span = self.spans.setdefault(name, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            span["count"] += 1
+            span["total_s"] += seconds
+            span["max_s"] = max(span["max_s"], seconds)
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def merge(self, prefix: str, stats: Dict[str, float]) -> None:
+        """Add a component's own ``stats`` dict (feed cache, enrichment cache) as counters."""
+        for key, value in stats.items():
+            self.count(f"{prefix}.{key}", value)
+
+    def instrument(self, session: requests.Session) -> requests.Session:
+        session.hooks.setdefault("response", []).append(self._on_response)
+        return session
+
+    def _on_response(self, response: requests.Response, *args, **kwargs) -> None:
+        host = urlparse(response.url).netloc or "unknown"
+        size = len(response.content or b"")
+        latency = response.elapsed.total_seconds()
+        status = str(response.status_code)
+        with self._lock:
+            entry = self.http.setdefault(host, {"requests": 0, "bytes": 0, "total_s": 0.0, "max_s": 0.0, "errors": 0, "status": {}})
+            entry["requests"] += 1  # type: ignore[operator]
+            entry["bytes"] += size  # type: ignore[operator]
+            entry["total_s"] += latency  # type: ignore[operator]
+            entry["max_s"] = max(entry["max_s"], latency)  # type: ignore[type-var]
+            if response.status_code >= 400:
+                entry["errors"] += 1  # type: ignore[operator]
+            codes: Dict[str, int] = entry["status"]  # type: ignore[assignment]
+            codes[status] = codes.get(status, 0) + 1
+
+    def snapshot(self, script: str, ok: bool) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "script": script,
+                "ok": ok,
+                "started_at": dt.datetime.fromtimestamp(self.started_at, dt.timezone.utc).isoformat(),
+                "duration_s": round(time.time() - self.started_at, 3),
+                "spans": {name: {k: round(v, 4) for k, v in span.items()} for name, span in sorted(self.spans.items())},
+                "counters": {name: round(value, 4) for name, value in sorted(self.counters.items())},
+                "http": {host: dict(entry, total_s=round(entry["total_s"], 4), max_s=round(entry["max_s"], 4)) for host, entry in sorted(self.http.items())},  # type: ignore[arg-type]
+            }
+
+    @contextlib.contextmanager
+    def run(self, script: str) -> Iterator[None]:
+        """Collect metrics for a script's ``main`` and write them out even if it fails."""
+        self.reset()
+        ok: Optional[bool] = False
+        try:
+            yield
+            ok = True
+        except SystemExit:
+            # --help ve argüman hataları bir çalışma sayılmaz
+            ok = None
+            raise
+        finally:
+            if ok is not None:
+                try:
+                    self.write(self.snapshot(script, ok))
+                except OSError as exc:
+                    logging.warning("Could not write run metrics: %s", exc)
+
+    def write(self, snapshot: Dict[str, object]) -> None:
+        if RUN_METRICS_DIR:
+            stamp = dt.datetime.now(dt.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+            path = pathlib.Path(RUN_METRICS_DIR) / f"{snapshot['script']}-{stamp}.json"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(snapshot, indent=2) + "\n", encoding="utf-8")
+            logging.info("Wrote run metrics to %s", path)
+        if RUN_METRICS_TEXTFILE_DIR:
+            path = pathlib.Path(RUN_METRICS_TEXTFILE_DIR) / f"ai_news_{snapshot['script']}.prom"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(".prom.tmp")
+            temp_path.write_text(to_prometheus(snapshot), encoding="utf-8")
+            temp_path.replace(path)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def to_prometheus(snapshot: Dict[str, object]) -> str:
+    """Render a snapshot in the Prometheus text exposition format."""
+    script = _label(str(snapshot["script"]))
+    lines = [
+        "# TYPE ai_news_run_duration_seconds gauge",
+        f'ai_news_run_duration_seconds{{script="{script}"}} {snapshot["duration_s"]}',
+        "# TYPE ai_news_run_success gauge",
+        f'ai_news_run_success{{script="{script}"}} {1 if snapshot["ok"] else 0}',
+        "# TYPE ai_news_run_timestamp_seconds gauge",
+        f'ai_news_run_timestamp_seconds{{script="{script}"}} {int(time.time())}',
+        "# TYPE ai_news_stage_seconds gauge",
+    ]
+    spans: Dict[str, Dict[str, float]] = snapshot["spans"]  # type: ignore[assignment]
+    for name, span in spans.items():
+        lines.append(f'ai_news_stage_seconds{{script="{script}",stage="{_label(name)}"}} {span["total_s"]}')
+    lines.append("# TYPE ai_news_count gauge")
+    counters: Dict[str, float] = snapshot["counters"]  # type: ignore[assignment]
+    for name, value in counters.items():
+        lines.append(f'ai_news_count{{script="{script}",name="{_label(name)}"}} {value}')
+    http: Dict[str, Dict[str, object]] = snapshot["http"]  # type: ignore[assignment]
+    for metric, key in (("requests", "requests"), ("bytes", "bytes"), ("seconds", "total_s"), ("errors", "errors")):
+        lines.append(f"# TYPE ai_news_http_{metric} gauge")
+        for host, entry in http.items():
+            lines.append(f'ai_news_http_{metric}{{script="{script}",host="{_label(host)}"}} {entry[key]}')
+    return "\n".join(lines) + "\n"
+
+
+metrics = RunMetrics()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Runs fetch, post, metrics, promotion, expiry, Markdown sync and overviews in one process."""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import promote_and_expire
+from common import configure_logging, load_domain_weights, open_state_store
+from fetch_and_post_daily import (
+    DEFAULT_LOOKBACK_HOURS,
+    OPENAI_API_KEY,
+    SLACK_BOT_TOKEN,
+    EnrichmentCache,
+    FeedCache,
+    FeedFetcher,
+    SlackClient,
+    post_new_items,
+    reconcile_postings,
+)
+from github_agent import GitHubAgent
+from posting_journal import PostingJournal
+from run_metrics import metrics
+from seen_ids import SeenIds
+from slack_transport import SlackTransport
+
+SCRIPTS_DIR = pathlib.Path(__file__).resolve().parent
+
+
+def run_pipeline(dry_run: bool = False) -> None:
+    """One cron cycle with a single state load and save and one shared Slack transport."""
+    lookback_hours = DEFAULT_LOOKBACK_HOURS
+    with metrics.span("load_state"):
+        store = open_state_store()
+        store.load()
+        seen = SeenIds()
+        seen.load()
+    token = None if dry_run else SLACK_BOT_TOKEN
+    transport = SlackTransport(token)
+    slack = SlackClient(token, transport)
+    journal = PostingJournal()
+    with metrics.span("reconcile"):
+        metrics.count("items.recovered", reconcile_postings(journal, store, seen, slack))
+
+    with metrics.span("fetch"):
+        feed_cache = FeedCache()
+        feed_cache.load()
+        raw_items = FeedFetcher(lookback_hours=lookback_hours, cache=feed_cache).fetch()
+        feed_cache.log_summary()
+        feed_cache.save()
+    metrics.merge("feed_cache", feed_cache.stats)
+    metrics.count("items.fetched", len(raw_items))
+
+    enrich_cache = EnrichmentCache()
+    enrich_cache.load()
+    fresh_items = post_new_items(raw_items, store, seen, slack, journal, load_domain_weights(), lookback_hours, enrich_cache)
+    if OPENAI_API_KEY:
+        enrich_cache.log_summary()
+        enrich_cache.save()
+        metrics.merge("enrich_cache", enrich_cache.stats)
+
+    slack_metrics = promote_and_expire.SlackMetricsClient(token, transport)
+    agent = GitHubAgent(token=os.environ.get("GITHUB_TOKEN"), repo=os.environ.get("GITHUB_REPOSITORY"))
+    try:
+        # run_cycle state'i tek seferde kaydeder (yeni gönderiler dahil)
+        promote_and_expire.run_cycle(store, seen, slack_metrics, agent, dry_run=dry_run)
+    except Exception:
+        # Terfi başarısız olsa da gönderilen kalemler kaybolmasın
+        store.save()
+        seen.save()
+        journal.clear()
+        raise
+    journal.clear()
+    if token:
+        transport.log_summary()
+
+    preview_path = os.environ.get("PREVIEW_JSON")
+    if preview_path:
+        with open(preview_path, "w", encoding="utf-8") as f:
+            json.dump([item.to_json() for item in fresh_items], f, indent=2)
+
+
+def _time_imports(modules: List[str], runs: int) -> float:
+    """Median wall time of a fresh interpreter importing ``modules`` (the cold start)."""
+    code = f"import sys; sys.path.insert(0, {str(SCRIPTS_DIR)!r}); import {', '.join(modules)}"
+    samples: List[float] = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def cold_start_report(runs: int = 5) -> Dict[str, float]:
+    """Compare start-up (interpreter, imports, state load) of the two-script workflow with this entry point."""
+    fetch = _time_imports(["fetch_and_post_daily"], runs)
+    promote = _time_imports(["promote_and_expire"], runs)
+    single = _time_imports(["run_pipeline"], runs)
+    started = time.perf_counter()
+    store = open_state_store()
+    store.load()
+    state_load = time.perf_counter() - started
+    # İki betikli yol state'i iki kez yükler
+    two_scripts = fetch + promote + 2 * state_load
+    one_process = single + state_load
+    return {
+        "fetch_and_post_daily_import_s": round(fetch, 4),
+        "promote_and_expire_import_s": round(promote, 4),
+        "run_pipeline_import_s": round(single, 4),
+        "state_load_s": round(state_load, 4),
+        "two_scripts_s": round(two_scripts, 4),
+        "run_pipeline_s": round(one_process, 4),
+        "saved_s": round(two_scripts - one_process, 4),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true", help="Do not post to Slack or open PRs")
+    parser.add_argument("--cold-start-report", action="store_true", help="Only measure start-up time against the two-script path and print it as JSON")
+    parser.add_argument("--runs", type=int, default=5, help="Interpreter launches per measurement for --cold-start-report")
+    args = parser.parse_args()
+    configure_logging()
+    if args.cold_start_report:
+        print(json.dumps(cold_start_report(max(1, args.runs)), indent=2))
+        return 0
+    run_pipeline(dry_run=args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    with metrics.run("run_pipeline"):
+        code = main()
+    sys.exit(code)
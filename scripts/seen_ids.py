@@ -0,0 +1,110 @@
+"""Compact persistent index of item IDs that have already been handled."""
+from __future__ import annotations
+
+import array
+import bisect
+import logging
+import os
+import pathlib
+import struct
+import sys
+import time
+from typing import Dict, Optional
+
+from common import STATE_PATH
+
+SEEN_IDS_PATH = pathlib.Path(os.environ.get("SEEN_IDS_PATH", str(STATE_PATH.parent / "seen_ids.bin")))
+SEEN_HORIZON_DAYS = float(os.environ.get("SEEN_HORIZON_DAYS", "90"))
+
+_MAGIC = b"SEENIDS1"
+_HEADER = struct.Struct("<8sQ")
+
+
+def _key(item_id: str) -> int:
+    # make_item_id: sha256 hex'in ilk 16 karakteri == 64 bit
+    return int(item_id[:16], 16)
+
+
+class SeenIds:
+    """Sorted array of 64-bit item ID prefixes with last-seen epoch seconds.
+
+    Membership is a binary search (O(log n)); at a million IDs the index is ~12 MB on
+    disk and in memory. IDs not seen within ``horizon_days`` are dropped on ``save``
+    (``0`` keeps them forever).
+    """
+
+    def __init__(self, path: pathlib.Path = SEEN_IDS_PATH, horizon_days: float = SEEN_HORIZON_DAYS) -> None:
+        self.path = path
+        self.horizon_days = horizon_days
+        self._keys = array.array("Q")
+        self._seen_at = array.array("I")
+        self._pending: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys) + sum(1 for key in self._pending if not self._indexed(key))
+
+    def load(self) -> None:
+        self._keys = array.array("Q")
+        self._seen_at = array.array("I")
+        self._pending.clear()
+        if not self.path.exists():
+            return
+        with self.path.open("rb") as f:
+            try:
+                magic, count = _HEADER.unpack(f.read(_HEADER.size))
+                if magic != _MAGIC:
+                    logging.warning("Seen-ID index %s has an unknown format; starting fresh", self.path)
+                    return
+                self._keys.fromfile(f, count)
+                self._seen_at.fromfile(f, count)
+            except (struct.error, EOFError, ValueError) as exc:
+                # Yarıda kesilmiş yazma: kısmen okunan diziler atılır
+                logging.warning("Seen-ID index %s is truncated; starting fresh: %s", self.path, exc)
+                self._keys = array.array("Q")
+                self._seen_at = array.array("I")
+                return
+        if sys.byteorder == "big":
+            self._keys.byteswap()
+            self._seen_at.byteswap()
+        logging.info("Loaded %d seen item IDs", count)
+
+    def save(self, now: Optional[float] = None) -> None:
+        self._merge(now if now is not None else time.time())
+        keys, seen_at = array.array("Q", self._keys), array.array("I", self._seen_at)
+        if sys.byteorder == "big":
+            keys.byteswap()
+            seen_at.byteswap()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with temp_path.open("wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(keys)))
+            keys.tofile(f)
+            seen_at.tofile(f)
+        temp_path.replace(self.path)
+
+    def add(self, item_id: str, when: Optional[float] = None) -> None:
+        self._pending[_key(item_id)] = int(when if when is not None else time.time())
+
+    def __contains__(self, item_id: object) -> bool:
+        if not isinstance(item_id, str):
+            return False
+        key = _key(item_id)
+        return key in self._pending or self._indexed(key)
+
+    def _indexed(self, key: int) -> bool:
+        pos = bisect.bisect_left(self._keys, key)
+        return pos < len(self._keys) and self._keys[pos] == key
+
+    def _merge(self, now: float) -> None:
+        cutoff = int(now - self.horizon_days * 86400) if self.horizon_days > 0 else 0
+        merged: Dict[int, int] = {}
+        for key, seen_at in zip(self._keys, self._seen_at):
+            if seen_at >= cutoff:
+                merged[key] = seen_at
+        for key, seen_at in self._pending.items():
+            if seen_at >= cutoff and seen_at >= merged.get(key, 0):
+                merged[key] = seen_at
+        ordered = sorted(merged)
+        self._keys = array.array("Q", ordered)
+        self._seen_at = array.array("I", (merged[key] for key in ordered))
+        self._pending.clear()
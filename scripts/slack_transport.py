@@ -0,0 +1,148 @@
+"""Rate-limited Slack Web API transport shared by the posting and metrics clients."""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional
+
+import requests
+
+import http_replay
+from run_metrics import metrics
+
+USER_AGENT = "ai-news-pipeline/1.0"
+SLACK_API = "https://slack.com/api"
+SLACK_MAX_WORKERS = int(os.environ.get("SLACK_MAX_WORKERS", "4"))
+SLACK_MAX_RETRIES = int(os.environ.get("SLACK_MAX_RETRIES", "3"))
+
+# Slack Web API rate tiers (requests per minute); https://api.slack.com/docs/rate-limits
+TIER_PER_MINUTE = {1: 1, 2: 20, 3: 50, 4: 100}
+METHOD_TIERS = {
+    "conversations.history": 3,
+    "conversations.replies": 3,
+    "reactions.get": 3,
+    "pins.list": 2,
+    "pins.add": 2,
+    "chat.delete": 3,
+    "chat.update": 3,
+}
+# chat.postMessage is "special": roughly one message per second per channel
+POST_MESSAGE_PER_MINUTE = 60
+
+
+def _retry_after_seconds(value: Optional[str], default: float = 1.0) -> float:
+    """Seconds from a ``Retry-After`` header; missing or malformed values fall back to ``default``."""
+    try:
+        seconds = float(value) if value is not None else default
+    except ValueError:
+        logging.debug("Ignoring malformed Retry-After header %r", value)
+        return default
+    # NaN/negatif değerler de varsayılana düşer
+    return seconds if seconds >= 0 else default
+
+
+class TokenBucket:
+    """Thread-safe token bucket (GCRA form); ``acquire`` blocks until a token is free."""
+
+    def __init__(self, per_minute: float, burst: int = 1) -> None:
+        self.interval = 60.0 / per_minute
+        self.burst = max(1, burst)
+        self._tat = 0.0
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            tat = max(self._tat, now)
+            allowed_at = max(tat - (self.burst - 1) * self.interval, now, self._blocked_until)
+            self._tat = max(tat, allowed_at) + self.interval
+        wait = allowed_at - now
+        if wait > 0:
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+    def block(self, seconds: float) -> None:
+        """Hold every caller back for ``seconds`` (used for ``Retry-After``)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+
+class SlackTransport:
+    """Shared session, per-method token buckets, ``Retry-After`` handling and a worker pool.
+
+    ``call`` runs a request on the current thread; ``submit`` queues it on a bounded pool
+    so independent calls (deletes, metric reads) overlap up to the allowed rate.
+    """
+
+    def __init__(self, token: Optional[str], max_workers: int = SLACK_MAX_WORKERS, max_retries: int = SLACK_MAX_RETRIES) -> None:
+        self.token = token
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        if token:
+            self.session.headers.update({"Authorization": f"Bearer {token}"})
+        http_replay.mount(self.session, pool_size=max_workers)
+        metrics.instrument(self.session)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="slack")
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.stats: Dict[str, float] = {"requests": 0, "throttled_s": 0.0, "rate_limited": 0, "max_in_flight": 0}
+
+    def _bucket(self, method: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(method)
+            if bucket is None:
+                if method == "chat.postMessage":
+                    bucket = TokenBucket(POST_MESSAGE_PER_MINUTE)
+                else:
+                    per_minute = TIER_PER_MINUTE[METHOD_TIERS.get(method, 3)]
+                    bucket = TokenBucket(per_minute, burst=max(1, per_minute // 10))
+                self._buckets[method] = bucket
+            return bucket
+
+    def call(self, method: str, http_method: str = "POST", params: Optional[Dict] = None, data: Optional[Dict] = None) -> Dict:
+        bucket = self._bucket(method)
+        for attempt in range(self.max_retries + 1):
+            waited = bucket.acquire()
+            metrics.count(f"slack.calls.{method}")
+            metrics.count("slack.throttled_s", waited)
+            with self._lock:
+                self.stats["requests"] += 1
+                self.stats["throttled_s"] += waited
+                self._in_flight += 1
+                self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+            try:
+                response = self.session.request(http_method, f"{SLACK_API}/{method}", params=params, data=data, timeout=30)
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+            if response.status_code == 429:
+                metrics.count("slack.rate_limited")
+                with self._lock:
+                    self.stats["rate_limited"] += 1
+                if attempt == self.max_retries:
+                    break
+                retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+                logging.warning("Slack rate limited %s; retrying in %ss", method, retry_after)
+                bucket.block(retry_after)
+                continue
+            response.raise_for_status()
+            return response.json()
+        raise RuntimeError(f"Slack {method} still rate limited after {self.max_retries} retries")
+
+    def submit(self, method: str, http_method: str = "POST", params: Optional[Dict] = None, data: Optional[Dict] = None) -> Future:
+        return self._executor.submit(self.call, method, http_method, params, data)
+
+    def log_summary(self) -> None:
+        logging.info(
+            "Slack transport: %d requests, %.1fs throttled, %d rate-limited responses, max %d in flight",
+            self.stats["requests"],
+            self.stats["throttled_s"],
+            self.stats["rate_limited"],
+            self.stats["max_in_flight"],
+        )
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""SQLite-backed StateStore with indexed status, publication and Slack timestamp lookups."""
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import json
+import logging
+import operator
+import os
+import pathlib
+import sqlite3
+import sys
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from common import STATE_PATH, NewsItem, StateStore, configure_logging, datetime_epoch, published_sort_key
+
+STATE_DB_PATH = pathlib.Path(os.environ.get("STATE_DB_PATH", str(STATE_PATH.with_suffix(".sqlite3"))))
+TS_COLUMNS = {"daily": "ts_daily", "weekly": "ts_weekly", "monthly": "ts_monthly"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    published_utc TEXT NOT NULL,
+    ts_daily REAL,
+    ts_weekly REAL,
+    ts_monthly REAL,
+    data TEXT NOT NULL,
+    published_epoch REAL
+);
+"""
+INDEXES = """
+DROP INDEX IF EXISTS items_status_published;
+CREATE INDEX IF NOT EXISTS items_status_published_epoch ON items (status, published_epoch);
+CREATE INDEX IF NOT EXISTS items_published ON items (published_utc);
+CREATE INDEX IF NOT EXISTS items_ts_daily ON items (ts_daily);
+CREATE INDEX IF NOT EXISTS items_ts_weekly ON items (ts_weekly);
+CREATE INDEX IF NOT EXISTS items_ts_monthly ON items (ts_monthly);
+"""
+INSERT_SQL = (
+    "INSERT OR REPLACE INTO items (id, status, published_utc, ts_daily, ts_weekly, ts_monthly, data, published_epoch)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+
+# Alan değerleri değişmez skalerler; tuple anlık görüntüsü save'de kirli kalemleri ayırır
+_snapshot: Callable[[NewsItem], Tuple] = operator.attrgetter(*(field.name for field in dataclasses.fields(NewsItem)))
+
+
+def _row(item: NewsItem) -> tuple:
+    return (
+        item.id,
+        item.status,
+        item.published_utc,
+        item.ts_daily_epoch,
+        item.ts_weekly_epoch,
+        item.ts_monthly_epoch,
+        json.dumps(item.to_json(), ensure_ascii=False),
+        item.published_epoch,
+    )
+
+
+def _migrate_schema(conn: sqlite3.Connection) -> None:
+    """Add and backfill ``published_epoch`` on databases created before it existed."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(items)")}
+    if "published_epoch" in columns:
+        return
+    with conn:
+        conn.execute("ALTER TABLE items ADD COLUMN published_epoch REAL")
+        rows = conn.execute("SELECT id, published_utc FROM items").fetchall()
+        conn.executemany(
+            "UPDATE items SET published_epoch = ? WHERE id = ?",
+            [(datetime_epoch(published), item_id) for item_id, published in rows],
+        )
+    logging.info("Added published_epoch to %d stored items", len(rows))
+
+
+class SQLiteStateStore:
+    """Drop-in StateStore replacement that reads rows on demand.
+
+    Items handed out by ``get``/``values``/queries are tracked in an identity map, so
+    in-place edits followed by ``save`` are persisted exactly as with the JSONL store.
+    ``save`` compares each tracked item with a snapshot of its field values taken when it
+    was read, and serializes and writes only the items that differ.
+    """
+
+    def __init__(self, path: pathlib.Path = STATE_DB_PATH) -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._items: Dict[str, NewsItem] = {}
+        self._loaded: Dict[str, Optional[Tuple]] = {}
+        self._removed: Set[str] = set()
+        self._changed: Set[str] = set()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path))
+            self._conn.executescript(SCHEMA)
+            _migrate_schema(self._conn)
+            self._conn.executescript(INDEXES)
+        return self._conn
+
+    def load(self) -> None:
+        self._items.clear()
+        self._loaded.clear()
+        self._removed.clear()
+        self._changed.clear()
+        count = self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+        logging.info("Opened %d items from %s", count, self.path)
+
+    def save(self) -> None:
+        dirty = [(item, snapshot) for item in self._items.values() if self._loaded.get(item.id) != (snapshot := _snapshot(item))]
+        rows = [_row(item) for item, _ in dirty]
+        with self.conn:
+            self.conn.executemany(INSERT_SQL, rows)
+            self.conn.executemany("DELETE FROM items WHERE id = ?", [(item_id,) for item_id in self._removed])
+        self._changed.update(row[0] for row in rows)
+        self._changed.update(self._removed)
+        for item, snapshot in dirty:
+            self._loaded[item.id] = snapshot
+        for item_id in self._removed:
+            self._loaded.pop(item_id, None)
+        logging.info("Persisted %d changed and %d removed items to %s", len(rows), len(self._removed), self.path)
+        self._removed.clear()
+
+    def changed_ids(self) -> Set[str]:
+        """IDs upserted, modified or removed since ``load``, as of the last ``save``."""
+        return set(self._changed)
+
+    def clear_changed_ids(self) -> None:
+        """Forget tracked changes once they have been synced (long-running processes)."""
+        self._changed.clear()
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def upsert(self, item: NewsItem) -> None:
+        self._items[item.id] = item
+        self._removed.discard(item.id)
+
+    def get(self, item_id: str) -> Optional[NewsItem]:
+        if item_id in self._removed:
+            return None
+        if item_id in self._items:
+            return self._items[item_id]
+        row = self.conn.execute("SELECT data FROM items WHERE id = ?", (item_id,)).fetchone()
+        return self._materialize(row[0]) if row else None
+
+    def remove(self, item_id: str) -> None:
+        self._items.pop(item_id, None)
+        self._removed.add(item_id)
+
+    def ids(self) -> Set[str]:
+        """IDs of every stored item, including unsaved upserts, without reading their data."""
+        stored = {item_id for (item_id,) in self.conn.execute("SELECT id FROM items")}
+        return (stored - self._removed) | self._items.keys()
+
+    def values(self) -> Iterable[NewsItem]:
+        return self._query("SELECT data FROM items", (), lambda item: True)
+
+    def by_status(self, status: str) -> List[NewsItem]:
+        """Items with ``status``, newest first."""
+        return self._query(
+            "SELECT data FROM items WHERE status = ? ORDER BY published_epoch DESC",
+            (status,),
+            lambda item: item.status == status,
+            order=published_sort_key,
+        )
+
+    def posted_before(self, status: str, cutoff_ts: float) -> List[NewsItem]:
+        """Items in ``status`` whose Slack post for that status is at or before ``cutoff_ts``.
+
+        Used to narrow TTL checks to items old enough to possibly expire.
+        """
+        column = TS_COLUMNS[status]
+        return self._query(
+            f"SELECT data FROM items WHERE status = ? AND {column} <= ?",
+            (status, cutoff_ts),
+            lambda item: item.status == status and (getattr(item, f"{column}_epoch") or float("inf")) <= cutoff_ts,
+        )
+
+    def published_before(self, status: str, cutoff_ts: float) -> List[NewsItem]:
+        """Items in ``status`` published at or before ``cutoff_ts`` (old enough to promote)."""
+        return self._query(
+            "SELECT data FROM items WHERE status = ? AND published_epoch <= ?",
+            (status, cutoff_ts),
+            lambda item: item.status == status and item.published_epoch is not None and item.published_epoch <= cutoff_ts,
+        )
+
+    def _query(self, sql: str, params: tuple, matches, order: Optional[Callable[[NewsItem], float]] = None) -> List[NewsItem]:
+        results: List[NewsItem] = []
+        seen: Set[str] = set()
+        for (data,) in self.conn.execute(sql, params):
+            item = self._materialize(data)
+            if item is None or not matches(item):
+                continue
+            seen.add(item.id)
+            results.append(item)
+        unsaved = [item for item in self._items.values() if item.id not in seen and matches(item)]
+        if unsaved:
+            results.extend(unsaved)
+            # Kaydedilmemiş kalemler SQL sıralamasının dışında kalır; yalnızca o zaman yeniden sıralanır
+            if order is not None:
+                results.sort(key=order, reverse=True)
+        return results
+
+    def _materialize(self, data: str) -> Optional[NewsItem]:
+        payload = json.loads(data)
+        item = NewsItem.from_json(payload)
+        if item.id in self._removed:
+            return None
+        if item.id not in self._items:
+            self._items[item.id] = item
+            # Epoch alanları olmayan eski satırlar bir sonraki save'de yeniden yazılır
+            self._loaded[item.id] = None if NewsItem.needs_migration(payload) else _snapshot(item)
+        return self._items[item.id]
+
+
+def import_jsonl(jsonl_path: pathlib.Path, db_path: pathlib.Path) -> int:
+    source = StateStore(jsonl_path)
+    source.load()
+    target = SQLiteStateStore(db_path)
+    with target.conn:
+        target.conn.execute("DELETE FROM items")
+        target.conn.executemany(INSERT_SQL, [_row(i) for i in source.values()])
+    target.close()
+    return len(source.values())
+
+
+def export_jsonl(db_path: pathlib.Path, jsonl_path: pathlib.Path) -> int:
+    source = SQLiteStateStore(db_path)
+    target = StateStore(jsonl_path, journal=False)
+    for item in source.values():
+        target.upsert(item)
+    target.save()
+    source.close()
+    return len(target.values())
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("command", choices=["import", "export"], help="import JSONL into SQLite, or export SQLite to JSONL")
+    parser.add_argument("--jsonl", type=pathlib.Path, default=STATE_PATH)
+    parser.add_argument("--db", type=pathlib.Path, default=STATE_DB_PATH)
+    args = parser.parse_args()
+    configure_logging()
+    if args.command == "import":
+        count = import_jsonl(args.jsonl, args.db)
+        logging.info("Imported %d items from %s into %s", count, args.jsonl, args.db)
+    else:
+        count = export_jsonl(args.db, args.jsonl)
+        logging.info("Exported %d items from %s to %s", count, args.db, args.jsonl)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Persisted min-heap of the next time promotion/expiry rules can change each item."""
+from __future__ import annotations
+
+import heapq
+import json
+import logging
+import os
+import pathlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from common import STATE_PATH, NewsItem, StateStore
+
+TRANSITION_INDEX_PATH = pathlib.Path(os.environ.get("TRANSITION_INDEX_PATH", str(STATE_PATH.parent / "transitions.jsonl")))
+
+RuleKey = Tuple[str, Optional[str], int, bool]
+
+
+def rule_key(item: NewsItem) -> RuleKey:
+    """Rule inputs that can change after an item is stored: status, its Slack ts and engagement."""
+    ts = item.ts_daily if item.status == "daily" else item.ts_weekly if item.status == "weekly" else item.ts_monthly
+    return item.status, ts, item.replies, item.pinned
+
+
+class TransitionIndex:
+    """Deadline index so a promotion pass only evaluates items whose next transition is due.
+
+    Every indexed item keeps the epoch second of its next possible transition (``None`` if
+    only an engagement change could move it) and the ``rule_key`` the deadline was computed
+    from. ``pending`` pops due entries off the heap and adds items that are not indexed
+    yet or were reported changed and whose key no longer matches (re-posted or newly
+    replied/pinned items); superseded heap entries are dropped lazily. The file is JSONL
+    like ``items.jsonl``: a header line with the ``rules`` signature, so changed
+    thresholds invalidate it, then one line per item sorted by id.
+    """
+
+    def __init__(self, path: pathlib.Path = TRANSITION_INDEX_PATH, rules: str = "") -> None:
+        self.path = path
+        self.rules = rules
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, Optional[float]] = {}
+        self._keys: Dict[str, RuleKey] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def load(self) -> None:
+        self._heap = []
+        self._deadlines.clear()
+        self._keys.clear()
+        if not self.path.exists():
+            return
+        skipped = 0
+        with self.path.open("r", encoding="utf-8") as f:
+            try:
+                header = json.loads(f.readline() or "{}")
+            except ValueError:
+                header = {}
+            if header.get("rules") != self.rules:
+                logging.info("Promotion rules changed or index header unreadable; rebuilding transition index")
+                return
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                # Okunamayan satırdaki kalem indekste yok sayılır ve yeniden değerlendirilir
+                try:
+                    data = json.loads(line)
+                    item_id, deadline = data["id"], data["deadline"]
+                    key = (data["status"], data["ts"], data["replies"], data["pinned"])
+                except (ValueError, KeyError):
+                    skipped += 1
+                    continue
+                self._keys[item_id] = key
+                self._deadlines[item_id] = deadline
+                if deadline is not None:
+                    self._heap.append((deadline, item_id))
+        if skipped:
+            logging.warning("Skipped %d unreadable lines in %s", skipped, self.path)
+        heapq.heapify(self._heap)
+        logging.debug("Loaded %d transition deadlines from %s", len(self._keys), self.path)
+
+    def save(self) -> None:
+        lines = [json.dumps({"rules": self.rules}, ensure_ascii=False)]
+        for item_id in sorted(self._keys):
+            status, ts, replies, pinned = self._keys[item_id]
+            record = {"id": item_id, "deadline": self._deadlines.get(item_id), "status": status, "ts": ts, "replies": replies, "pinned": pinned}
+            lines.append(json.dumps(record, ensure_ascii=False))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        temp_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        temp_path.replace(self.path)
+
+    def pending(self, store: StateStore, changed_ids: Iterable[str], now_ts: float) -> List[NewsItem]:
+        """Items due at ``now_ts``, not indexed yet, or in ``changed_ids`` with a new rule key.
+
+        ``changed_ids`` are the items whose status, Slack ts or engagement may have changed
+        since they were scheduled (``refresh_metrics`` result plus ``store.changed_ids()``).
+        Ids the store no longer has are forgotten. Only these items are read from the
+        store; the rest are never materialized.
+        """
+        stored = store.ids()
+        for item_id in self._keys.keys() - stored:
+            self.discard(item_id)
+        selected: Dict[str, NewsItem] = {}
+        for item_id in (stored - self._keys.keys()) | (set(changed_ids) & stored):
+            item = store.get(item_id)
+            if item is not None and self._keys.get(item_id) != rule_key(item):
+                selected[item_id] = item
+        while self._heap and self._heap[0][0] <= now_ts:
+            deadline, item_id = heapq.heappop(self._heap)
+            # Yeniden planlanan kalemlerin eski heap kayıtları atlanır
+            if self._deadlines.get(item_id) != deadline:
+                continue
+            self._deadlines[item_id] = None
+            item = store.get(item_id)
+            if item is not None:
+                selected[item_id] = item
+        return [selected[item_id] for item_id in sorted(selected)]
+
+    def schedule(self, item: NewsItem, deadline: Optional[float]) -> None:
+        self._keys[item.id] = rule_key(item)
+        self._deadlines[item.id] = deadline
+        if deadline is not None:
+            heapq.heappush(self._heap, (deadline, item.id))
+        if len(self._heap) > 2 * len(self._deadlines) + 1024:
+            self._heap = [(d, i) for i, d in self._deadlines.items() if d is not None]
+            heapq.heapify(self._heap)
+
+    def discard(self, item_id: str) -> None:
+        self._keys.pop(item_id, None)
+        self._deadlines.pop(item_id, None)
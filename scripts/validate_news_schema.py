@@ -2,12 +2,23 @@
 """Validates Markdown front matter for news items."""
 from __future__ import annotations
 
+import argparse
+import hashlib
+import json
+import os
 import pathlib
+import subprocess
 import sys
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import yaml
 
+try:  # libyaml varsa C hızlandırmalı loader
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:  # pragma: no cover - depends on the PyYAML build
+    from yaml import SafeLoader as YamlLoader  # type: ignore[assignment]
+
 REQUIRED_FIELDS = {
     "id": str,
     "url": str,
@@ -21,12 +32,45 @@ REQUIRED_FIELDS = {
     "impact": str,
     "affected": str,
 }
-VALID_STATUSES = {"daily", "weekly", "monthly"}
+VALID_STATUSES = {"daily", "weekly", "monthly", "archived"}
+# news/index.md, news/archived/index.md, news/archived/months/*.md ve README'ler front matter taşımaz
+NON_ITEM_PAGES = {"index.md", "README.md"}
 
+SCHEMA_CACHE_PATH = pathlib.Path(os.environ.get("SCHEMA_CACHE_PATH", ".schema-cache.json"))
+# Şema kuralları değişince eski cache sonuçları geçersiz olur
+SCHEMA_VERSION = hashlib.sha256(repr((sorted((k, repr(v)) for k, v in REQUIRED_FIELDS.items()), sorted(VALID_STATUSES))).encode()).hexdigest()[:12]
+PARALLEL_THRESHOLD = 256
 
-def validate_file(path: pathlib.Path) -> List[str]:
+
+def iter_item_files(root: pathlib.Path) -> Iterator[pathlib.Path]:
+    """Yield ``news/<status>/<id>.md`` item files, skipping index pages and archive shards."""
+    for path in root.rglob("*.md"):
+        parts = path.relative_to(root).parts
+        if len(parts) == 2 and parts[0] in VALID_STATUSES and path.name not in NON_ITEM_PAGES:
+            yield path
+
+
+def parse_front_matter(header: str) -> object:
+    """Parse front matter, using ``json.loads`` for the ``key: <json>`` lines build_markdown emits.
+
+    Anything that is not in that shape (hand edits, YAML-only syntax) goes through YAML.
+    """
+    data: Dict[str, object] = {}
+    for line in header.splitlines():
+        if not line.strip():
+            continue
+        key, sep, value = line.partition(": ")
+        if not sep or not key or key != key.strip():
+            return yaml.load(header, Loader=YamlLoader)
+        try:
+            data[key] = json.loads(value)
+        except ValueError:
+            return yaml.load(header, Loader=YamlLoader)
+    return data
+
+
+def validate_text(path: str, text: str) -> List[str]:
     errors: List[str] = []
-    text = path.read_text(encoding="utf-8")
     if not text.startswith("---\n"):
         errors.append(f"{path}: missing YAML front matter")
         return errors
@@ -35,7 +79,7 @@ def validate_file(path: pathlib.Path) -> List[str]:
     except ValueError:
         errors.append(f"{path}: malformed YAML front matter")
         return errors
-    data = yaml.safe_load(header)
+    data = parse_front_matter(header)
     if not isinstance(data, dict):
         errors.append(f"{path}: front matter must be a mapping")
         return errors
@@ -51,13 +95,98 @@ def validate_file(path: pathlib.Path) -> List[str]:
     return errors
 
 
-def main() -> int:
+def validate_file(path: pathlib.Path) -> List[str]:
+    return validate_text(str(path), path.read_text(encoding="utf-8"))
+
+
+def _check(path: str) -> Tuple[str, str, List[str]]:
+    data = pathlib.Path(path).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    return path, digest, validate_text(path, data.decode("utf-8"))
+
+
+class ValidationCache:
+    """Per-file content hash and validation errors from earlier runs."""
+
+    def __init__(self, path: pathlib.Path = SCHEMA_CACHE_PATH) -> None:
+        self.path = path
+        self.files: Dict[str, Dict[str, object]] = {}
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except ValueError:
+            return
+        if data.get("schema") == SCHEMA_VERSION:
+            self.files = data.get("files", {})
+
+    def save(self) -> None:
+        self.path.write_text(json.dumps({"schema": SCHEMA_VERSION, "files": self.files}, sort_keys=True), encoding="utf-8")
+
+    def lookup(self, path: str, digest: str) -> Optional[List[str]]:
+        entry = self.files.get(path)
+        if entry and entry.get("hash") == digest:
+            return list(entry.get("errors", []))  # type: ignore[arg-type]
+        return None
+
+
+def changed_files(root: pathlib.Path, ref: str) -> List[pathlib.Path]:
+    """Item files added or modified since ``ref`` according to ``git diff``."""
+    output = subprocess.run(
+        ["git", "diff", "--name-only", "--diff-filter=AMR", ref, "--", str(root)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    candidates = {pathlib.Path(line) for line in output.splitlines() if line.endswith(".md")}
+    return [path for path in iter_item_files(root) if path in candidates]
+
+
+def validate_paths(paths: Iterable[pathlib.Path], cache: Optional[ValidationCache], workers: Optional[int]) -> List[str]:
+    errors: List[str] = []
+    pending: List[str] = []
+    for path in paths:
+        key = str(path)
+        if cache is not None:
+            cached = cache.lookup(key, hashlib.sha256(path.read_bytes()).hexdigest())
+            if cached is not None:
+                errors.extend(cached)
+                continue
+        pending.append(key)
+    if len(pending) >= PARALLEL_THRESHOLD and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_check, pending, chunksize=64))
+    else:
+        results = [_check(path) for path in pending]
+    for path, digest, file_errors in results:
+        errors.extend(file_errors)
+        if cache is not None:
+            cache.files[path] = {"hash": digest, "errors": file_errors}
+    return errors
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--full", action="store_true", help="Revalidate every file, ignoring the result cache")
+    parser.add_argument("--changed-from", metavar="REF", help="Only validate item files changed since this git ref")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size for large scans (1 disables)")
+    args = parser.parse_args(argv)
+
     root = pathlib.Path("news")
     if not root.exists():
         return 0
-    errors: List[str] = []
-    for path in root.rglob("*.md"):
-        errors.extend(validate_file(path))
+    cache: Optional[ValidationCache] = None
+    if not args.full:
+        cache = ValidationCache()
+        cache.load()
+    paths = changed_files(root, args.changed_from) if args.changed_from else sorted(iter_item_files(root))
+    errors = validate_paths(paths, cache, args.workers)
+    if cache is not None:
+        live = {str(path) for path in iter_item_files(root)}
+        cache.files = {path: entry for path, entry in cache.files.items() if path in live}
+        cache.save()
     if errors:
         for line in errors:
             print(line)